@@ -0,0 +1,229 @@
+"""
+BM25 index over the corpus chunk files: flat postings arrays (doc_id, tf, first offset) per term,
+per-chunk lengths and idf, scored by a JIT kernel. Built by the indexer next to manifest.json and
+loaded once by retrieval, so keyword search scores only the chunks that contain a query term
+instead of re-reading the corpus.
+"""
+import os
+import pickle
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:  # numba is optional; scoring falls back to the NumPy kernel
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+    _HAVE_NUMBA = False
+
+INDEX_FILENAME = "bm25.pkl"
+# Bumped when the pickled layout changes; older files are rebuilt from the manifest
+INDEX_VERSION = 3
+TOKEN_RE = re.compile(r"\w+")
+K1 = 1.5
+B = 0.75
+
+# Dropped from queries by retrieval (unless a query has nothing else). Chunks index every token,
+# so a stopword-only query can still match; BM25's idf keeps such common words low-weight.
+STOPWORDS = frozenset({"the", "and", "for", "with", "from", "that", "this", "query", "search", "what", "is", "of", "in", "to", "a", "an"})
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# cache_dir -> (index file mtime_ns, index)
+_loaded: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+# manifest path -> (mtime_ns, manifest)
+_manifests: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, Any]:
+    """Parse manifest.json, reusing the previous parse while the file's mtime is unchanged."""
+    key = str(manifest_path)
+    mtime = manifest_path.stat().st_mtime_ns
+    cached = _manifests.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    manifest = _json_loads(manifest_path.read_bytes())
+    _manifests[key] = (mtime, manifest)
+    return manifest
+
+
+def manifest_chunk_files(manifest: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Flatten manifest into (rel_path, chunk_filename) pairs; values may be a name or a list of names."""
+    pairs = []
+    for rel_path, names in manifest.items():
+        for name in ([names] if isinstance(names, str) else names):
+            pairs.append((rel_path, name))
+    return pairs
+
+
+def new_index() -> Dict[str, Any]:
+    """
+    Empty index being built. docs[doc_id] = (rel_path, chunk_filename); doc_len[doc_id] = indexed
+    token count; postings[token] = [(doc_id, tf, first_offset)]. finalize() turns it into arrays.
+    """
+    return {"docs": [], "doc_len": [], "postings": {}}
+
+
+def add_document(index: Dict[str, Any], rel_path: str, chunk_name: str, text: str) -> None:
+    """Tokenize one chunk (lowercased) and append its postings."""
+    doc_id = len(index["docs"])
+    index["docs"].append((rel_path, chunk_name))
+    tf: Dict[str, int] = {}
+    first: Dict[str, int] = {}
+    for m in TOKEN_RE.finditer(text.lower()):
+        token = m.group()
+        tf[token] = tf.get(token, 0) + 1
+        first.setdefault(token, m.start())
+    index["doc_len"].append(sum(tf.values()))
+    postings = index["postings"]
+    for token, count in tf.items():
+        postings.setdefault(token, []).append((doc_id, count, first[token]))
+
+
+def finalize(index: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the build-time postings dict into flat arrays (structure of arrays): term t's postings
+    are postings_doc/tf/first[postings_off[t]:postings_off[t + 1]]. Also computes avgdl and idf
+    (BM25 with the +1 smoothing, so idf is never negative).
+    """
+    postings = index.pop("postings")
+    n = len(index["docs"])
+    vocab = {token: i for i, token in enumerate(postings)}
+    flat = [p for plist in postings.values() for p in plist]
+    off = np.zeros(len(vocab) + 1, dtype=np.int64)
+    off[1:] = np.cumsum([len(plist) for plist in postings.values()])
+    df = np.diff(off).astype(np.float32)
+
+    index["vocab"] = vocab
+    index["postings_off"] = off
+    index["postings_doc"] = np.array([p[0] for p in flat], dtype=np.int32)
+    index["postings_tf"] = np.array([p[1] for p in flat], dtype=np.float32)
+    index["postings_first"] = np.array([p[2] for p in flat], dtype=np.int32)
+    index["doc_len"] = np.asarray(index["doc_len"], dtype=np.float32)
+    index["avgdl"] = float(index["doc_len"].mean()) if n else 0.0
+    index["idf"] = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+    index["version"] = INDEX_VERSION
+    return index
+
+
+@njit(cache=True)
+def _bm25_kernel(term_idxs, postings_off, postings_doc, postings_tf, postings_first, idf, doc_len, avgdl, k1, b, scores_out, first_out):
+    # Serial on purpose: a library's postings lists are short, so spinning up threads per
+    # query term (parallel=True/prange) costs more than the loop it would split.
+    for j in range(term_idxs.shape[0]):
+        t = term_idxs[j]
+        w = idf[t]
+        for p in range(postings_off[t], postings_off[t + 1]):
+            d = postings_doc[p]
+            tf = postings_tf[p]
+            scores_out[d] += w * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * doc_len[d] / avgdl))
+            if postings_first[p] < first_out[d]:
+                first_out[d] = postings_first[p]
+
+
+def _bm25_numpy(term_idxs, postings_off, postings_doc, postings_tf, postings_first, idf, doc_len, avgdl, k1, b, scores_out, first_out):
+    """Same contract as _bm25_kernel, vectorized per term for installs without numba."""
+    for t in term_idxs:
+        lo, hi = postings_off[t], postings_off[t + 1]
+        d = postings_doc[lo:hi]
+        tf = postings_tf[lo:hi]
+        # doc ids are unique within a term's postings, so plain fancy-index updates are safe
+        scores_out[d] += idf[t] * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * doc_len[d] / avgdl))
+        first_out[d] = np.minimum(first_out[d], postings_first[lo:hi])
+
+
+_score_terms = _bm25_kernel if _HAVE_NUMBA else _bm25_numpy
+
+
+def top_docs(index: Dict[str, Any], terms: Iterable[str], k: int) -> List[Tuple[int, float, int]]:
+    """
+    Best k chunks by BM25 as (doc_id, score, first_offset), highest first and corpus order among
+    ties; first_offset is the earliest hit of any matched term. Only the terms' postings are read.
+    """
+    vocab = index["vocab"]
+    term_idxs = np.array([vocab[t] for t in dict.fromkeys(terms) if t in vocab], dtype=np.int64)
+    if term_idxs.size == 0 or k <= 0:
+        return []
+    n = len(index["docs"])
+    scores = np.zeros(n, dtype=np.float32)
+    first = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+    _score_terms(
+        term_idxs, index["postings_off"], index["postings_doc"], index["postings_tf"], index["postings_first"],
+        index["idf"], index["doc_len"], index["avgdl"] or 1.0, K1, B, scores, first,
+    )
+    matched = np.flatnonzero(scores > 0)
+    if matched.size > k:
+        matched = np.sort(matched[np.argpartition(-scores[matched], k - 1)[:k]])
+    order = matched[np.argsort(-scores[matched], kind="stable")]
+    return [(int(d), float(scores[d]), int(first[d])) for d in order]
+
+
+def build_from_manifest(cache_dir: Path, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Build an index from chunk files already on disk (used for caches written before the index existed)."""
+    index = new_index()
+    for rel_path, name in manifest_chunk_files(manifest):
+        txt_path = cache_dir / name
+        if not txt_path.exists():
+            continue
+        add_document(index, rel_path, name, txt_path.read_text(encoding="utf-8", errors="replace"))
+    return index
+
+
+def write_index(cache_dir: Path, index: Dict[str, Any]) -> None:
+    """Finalize and persist atomically (tmp file + rename) so a concurrent reader never sees a partial pickle."""
+    finalize(index)
+    path = cache_dir / INDEX_FILENAME
+    # Unique temp name per writer so concurrent rebuilds never share (and corrupt) one file.
+    with tempfile.NamedTemporaryFile(dir=cache_dir, prefix="bm25.", suffix=".tmp", delete=False) as f:
+        tmp = f.name
+        try:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    os.replace(tmp, path)
+
+
+def load_index(cache_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    Return the index for cache_dir, reusing the in-memory copy while the file is unchanged.
+    Rebuilds (and persists) it from manifest.json when missing or older than the manifest.
+    Returns None if there is no manifest.
+    """
+    manifest_path = cache_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    index_path = cache_dir / INDEX_FILENAME
+    try:
+        index_mtime = index_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        index_mtime = -1
+
+    if index_mtime < manifest_path.stat().st_mtime_ns:
+        manifest = load_manifest(manifest_path)
+        index = build_from_manifest(cache_dir, manifest)
+        write_index(cache_dir, index)
+        index_mtime = index_path.stat().st_mtime_ns
+        _loaded[str(cache_dir)] = (index_mtime, index)
+        return index
+
+    cached = _loaded.get(str(cache_dir))
+    if cached and cached[0] == index_mtime:
+        return cached[1]
+    with open(index_path, "rb") as f:
+        index = pickle.load(f)
+    if index.get("version") != INDEX_VERSION:
+        index = build_from_manifest(cache_dir, load_manifest(manifest_path))
+        write_index(cache_dir, index)
+        index_mtime = index_path.stat().st_mtime_ns
+    _loaded[str(cache_dir)] = (index_mtime, index)
+    return index
@@ -7,21 +7,36 @@ from typing import Optional
 
 _library_root: Optional[str] = None
 
+# Resolved root (env LIBRARY_ROOT wins over in-memory). Computed on first read and
+# rewritten by set_library_root, so hot paths like /api/chat never re-read the environment.
+# LIBRARY_ROOT is therefore read once (and again only inside set_library_root); changing it
+# in the environment of a running process has no effect until restart.
+_UNSET = object()
+_ROOT_CACHE = _UNSET
 
-def get_library_root() -> Optional[str]:
-    """Return the configured library root path (env LIBRARY_ROOT or in-memory)."""
-    global _library_root
+
+def _resolve_library_root() -> Optional[str]:
     env_root = os.environ.get("LIBRARY_ROOT", "").strip()
     if env_root:
         return env_root
     return _library_root
 
 
+def get_library_root() -> Optional[str]:
+    """Return the configured library root path (env LIBRARY_ROOT, read once, or in-memory)."""
+    global _ROOT_CACHE
+    if _ROOT_CACHE is _UNSET:
+        _ROOT_CACHE = _resolve_library_root()
+    return _ROOT_CACHE
+
+
 def set_library_root(path: Optional[str]) -> None:
     """Set the library root path (in-memory)."""
-    global _library_root
+    global _library_root, _ROOT_CACHE
     if path is None:
         _library_root = None
-        return
-    s = path.strip()
-    _library_root = s if s else None
+    else:
+        s = path.strip()
+        _library_root = s if s else None
+    _ROOT_CACHE = _resolve_library_root()
+
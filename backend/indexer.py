@@ -2,13 +2,18 @@
 Indexer: walk library root, parse supported files, write chunked text to corpus/cache directory.
 Exposes run_index() and get_status() for the API.
 """
+import contextlib
+import multiprocessing
 import os
+import re
 import time
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-from .parsers import parse_file, SUPPORTED_EXTENSIONS
+from .parsers import parse_file, pdf_cache_path, SUPPORTED_EXTENSIONS
+from . import bm25_index
 
 # In-memory status (replace with file or DB later)
 _index_status: Dict[str, Any] = {
@@ -30,6 +35,27 @@ def get_cache_dir(library_root: Optional[Path] = None) -> Path:
     return Path(__file__).resolve().parent.parent / "cache"
 
 
+def get_pdf_cache_dir(library_root: Optional[Path] = None) -> Path:
+    """Extracted-PDF-text cache. Kept out of the corpus dir, which Cactus indexes as RAG documents."""
+    if library_root:
+        return Path(library_root) / ".deepfocus_pdf_cache"
+    return get_cache_dir().parent / "pdf_cache"
+
+
+# Extracted-text cache entries (parsers.pdf_cache_path); chunk files never match this
+_PDF_CACHE_FILE_RE = re.compile(r"^pdf_[0-9a-f]{40}\.txt$")
+
+
+def _prune_pdf_cache(pdf_cache_dir: Path, keep: set) -> None:
+    """Delete cached PDF texts whose (path, size, mtime) no longer matches a live file."""
+    for entry in os.scandir(pdf_cache_dir):
+        if _PDF_CACHE_FILE_RE.match(entry.name) and entry.name not in keep:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
 def split_text_into_chunks(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
     """
     Pure Python text chunker mimicking LangChain's CharacterTextSplitter.
@@ -80,10 +106,12 @@ def run_index(library_root: str) -> Dict[str, Any]:
     cache_dir.mkdir(parents=True, exist_ok=True)
     
     manifest = {}
+    bm25 = bm25_index.new_index()
     errors = []
     files_indexed = 0
 
     all_paths = list(root.rglob("*"))
+    paths = []
 
     for path in all_paths:
         if not path.is_file():
@@ -96,36 +124,82 @@ def run_index(library_root: str) -> Dict[str, Any]:
             
         if path.suffix.lower() not in SUPPORTED_EXTENSIONS:
             continue
-        
+        paths.append(path)
+
+    # PDF extraction is CPU-bound, so PDFs missing from the extracted-text cache are parsed in
+    # worker processes up front; cached ones are read here, and no pool is started when every PDF
+    # is cached. Workers are spawned, not forked, since the server process already runs threads
+    # (uvicorn, model preload).
+    pdf_paths = [p for p in paths if p.suffix.lower() == ".pdf"]
+    pdf_cache_dir = get_pdf_cache_dir(root)
+    pdf_cache_dir.mkdir(parents=True, exist_ok=True)
+    pdf_misses = []
+    for p in pdf_paths:
         try:
-            text = parse_file(path)
-            if text is None or not text.strip():
-                continue
+            if not pdf_cache_path(p, pdf_cache_dir).exists():
+                pdf_misses.append(p)
+        except OSError:
+            pass  # unreadable; parse_file below reports it
+    pool = ProcessPoolExecutor(
+        max_workers=min(len(pdf_misses), os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) if pdf_misses else contextlib.nullcontext()
+
+    with pool:
+        pdf_futures = {p: pool.submit(parse_file, p, pdf_cache_dir) for p in pdf_misses}
+
+        for path in paths:
+            try:
+                if path in pdf_futures:
+                    text = pdf_futures[path].result()
+                elif path.suffix.lower() == ".pdf":
+                    text = parse_file(path, pdf_cache_dir)
+                else:
+                    text = parse_file(path)
+                if text is None or not text.strip():
+                    continue
             
-            # Chunk the text using the native Python function
-            chunks = split_text_into_chunks(text, chunk_size=1000, overlap=200)
+                # Chunk the text using the native Python function
+                chunks = split_text_into_chunks(text, chunk_size=1000, overlap=200)
             
-            # Create a safe base name for the cache files
-            rel = path.relative_to(root)
-            safe_base_name = str(rel).replace("/", "_").replace("\\", "_")
+                # Create a safe base name for the cache files
+                rel = path.relative_to(root)
+                safe_base_name = str(rel).replace("/", "_").replace("\\", "_")
             
-            chunk_files = []
-            for idx, chunk in enumerate(chunks):
-                chunk_filename = f"{safe_base_name}_chunk{idx}.txt"
-                out_path = cache_dir / chunk_filename
-                out_path.write_text(chunk, encoding="utf-8", errors="replace")
-                chunk_files.append(chunk_filename)
+                chunk_files = []
+                for idx, chunk in enumerate(chunks):
+                    chunk_filename = f"{safe_base_name}_chunk{idx}.txt"
+                    out_path = cache_dir / chunk_filename
+                    out_path.write_text(chunk, encoding="utf-8", errors="replace")
+                    chunk_files.append(chunk_filename)
             
-            manifest[str(rel)] = chunk_files
-            files_indexed += 1
+                manifest[str(rel)] = chunk_files
+                for chunk_filename, chunk in zip(chunk_files, chunks):
+                    bm25_index.add_document(bm25, str(rel), chunk_filename, chunk)
+                files_indexed += 1
             
-        except Exception as e:
-            errors.append(f"{path}: {e}")
+            except Exception as e:
+                errors.append(f"{path}: {e}")
+
+    live_pdf_cache = set()
+    for path in pdf_paths:
+        try:
+            live_pdf_cache.add(pdf_cache_path(path, pdf_cache_dir).name)
+        except OSError:
+            pass
+    _prune_pdf_cache(pdf_cache_dir, live_pdf_cache)
+    # Earlier builds cached PDF text inside the corpus dir itself, where RAG picked it up
+    _prune_pdf_cache(cache_dir, set())
 
     # Write the updated manifest
     manifest_path = cache_dir / "manifest.json"
     manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    # Written after the manifest so its mtime marks it as current for this manifest
+    bm25_index.write_index(cache_dir, bm25)
     
+    from .retrieval import clear_search_cache
+    clear_search_cache()
+
     _index_status = {
         "last_run": time.time(),
         "files_indexed": files_indexed,
@@ -152,7 +226,7 @@ def get_status() -> Dict[str, Any]:
         
         if manifest_path.exists():
             try:
-                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                manifest = bm25_index.load_manifest(manifest_path)
                 _index_status = {
                     "last_run": os.path.getmtime(manifest_path),
                     "files_indexed": len(manifest),
@@ -1,9 +1,13 @@
 """
 FastAPI backend — run from repo root: uvicorn backend.main:app --reload --host 0.0.0.0 --port 8000
 """
+import asyncio
 import os
+import re
 import sys
-import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
 
 # Ensure repo root is on path (for main.generate_hybrid, etc.)
@@ -11,22 +15,49 @@ _REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(_REPO_ROOT))
 
 from fastapi import FastAPI, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+import aiofiles
+import aiofiles.tempfile
+import msgspec
+import numpy as np
 import yfinance as yf
 
-from main import generate_hybrid, generate_cactus, transcribe_audio
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels run as plain Python
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+from main import generate_hybrid, generate_cactus, get_gemini_client, transcribe_audio, _take_cloud_slot, configure_result_cache
 
 from backend import config as library_config
 from backend.indexer import run_index, get_status as get_index_status
-from backend.retrieval import search as retrieval_search
+from backend.retrieval import search as retrieval_search, reset_rag_model
+
+# Repeated chat turns may reuse a recent model result (main.py leaves this off by default)
+configure_result_cache(float(os.getenv("RESULT_CACHE_TTL_S", "300")))
+
+try:
+    import orjson
+
+    class FastJSONResponse(JSONResponse):
+        """JSONResponse rendered with orjson (NumPy scalars/arrays from the finance tools included)."""
 
-app = FastAPI(title="Deep-Focus API")
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+app = FastAPI(title="Deep-Focus API", default_response_class=FastJSONResponse)
+
+# Parsed once: stripped, non-empty origins (a trailing comma in CORS_ORIGINS no longer yields "").
+_CORS_ORIGINS = tuple(o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip())
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=os.getenv("CORS_ORIGINS", "http://localhost:3000").split(","),
+    allow_origins=list(_CORS_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -34,25 +65,107 @@ app.add_middleware(
 
 
 # ---- BS Detector (teammate feature) ----
-class BSRequest(BaseModel):
+class BSRequest(msgspec.Struct):
     text: str
 
 
-@app.post("/detect")
-def detect_bs(request: BSRequest):
-    text = request.text.lower()
-    corporate_buzzwords = ["synergize", "paradigm", "agile", "roi", "cross-functional"]
-    flagged = [word for word in corporate_buzzwords if word in text]
+_decode_bs_request = msgspec.json.Decoder(BSRequest).decode
+# Handlers that read the raw body get no schema from FastAPI, so /detect declares it itself
+_BS_REQUEST_SCHEMA = msgspec.json.schema_components((BSRequest,))[1]["BSRequest"]
+
+_MSGSPEC_MISSING_RE = re.compile(r"^Object missing required field `([^`]*)`")
+_MSGSPEC_AT_RE = re.compile(r"^(.*) - at `\$(.*)`$")
+_MSGSPEC_PATH_RE = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+_MSGSPEC_BYTE_RE = re.compile(r"\(byte (\d+)\)$")
+
+
+def _msgspec_error_detail(exc: msgspec.MsgspecError) -> list:
+    """A msgspec decode error as FastAPI's 422 "detail": a list of {type, loc, msg} error objects."""
+    msg = str(exc)
+    if not isinstance(exc, msgspec.ValidationError):  # ValidationError subclasses DecodeError
+        m = _MSGSPEC_BYTE_RE.search(msg)
+        return [{"type": "json_invalid", "loc": ["body", int(m[1]) if m else 0], "msg": "JSON decode error", "ctx": {"error": msg}}]
+    loc = ["body"]
+    m = _MSGSPEC_AT_RE.match(msg)
+    if m:
+        msg = m[1]
+        loc += [int(idx) if idx else name for name, idx in _MSGSPEC_PATH_RE.findall(m[2])]
+    m = _MSGSPEC_MISSING_RE.match(msg)
+    if m:
+        return [{"type": "missing", "loc": loc + [m[1]], "msg": "Field required"}]
+    return [{"type": "value_error", "loc": loc, "msg": msg}]
+
+CORPORATE_BUZZWORDS = ("synergize", "paradigm", "agile", "roi", "cross-functional")
+
+# One linear pass over the text for all buzzwords: Aho-Corasick when pyahocorasick is installed,
+# otherwise a precompiled alternation (lookahead so overlapping hits are still reported).
+try:
+    import ahocorasick
+
+    _BUZZ_AC = ahocorasick.Automaton()
+    for _word in CORPORATE_BUZZWORDS:
+        _BUZZ_AC.add_word(_word, _word)
+    _BUZZ_AC.make_automaton()
+
+    def _find_buzzwords(text: str) -> set:
+        return {word for _, word in _BUZZ_AC.iter(text)}
+except ImportError:
+    _BUZZ_RE = re.compile("(?=(" + "|".join(map(re.escape, CORPORATE_BUZZWORDS)) + "))")
+
+    def _find_buzzwords(text: str) -> set:
+        return set(_BUZZ_RE.findall(text))
+
+
+@app.post(
+    "/detect",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": _BS_REQUEST_SCHEMA}}}},
+)
+async def detect_bs(request: Request):
+    # Decode straight from the raw body with msgspec instead of building a Pydantic model per call.
+    try:
+        body = _decode_bs_request(await request.body())
+    except msgspec.MsgspecError as e:
+        return FastJSONResponse(status_code=422, content={"detail": _msgspec_error_detail(e)})
+    found = _find_buzzwords(body.text.lower())
+    flagged = [word for word in CORPORATE_BUZZWORDS if word in found]
     if len(flagged) > 0:
         return {"is_bs": True, "bs_score": 85, "flagged_words": flagged}
     return {"is_bs": False, "bs_score": 0, "flagged_words": []}
 
 
 # ---- Tool implementations ----
+# Short-lived per-ticker cache for yfinance lookups: repeat questions about the same symbol
+# within the TTL skip the blocking HTTPS round trips. Only non-empty results are cached, and
+# the cache is an LRU capped at _YF_MAX_ENTRIES so arbitrary tickers cannot grow it forever.
+_YF_TTL_S = 30.0
+_YF_MAX_ENTRIES = 256
+_yf_cache = OrderedDict()  # (kind, TICKER) -> (fetched_at, value)
+_yf_lock = threading.Lock()
+
+
+def _yf_cached(kind: str, ticker: str, fetch):
+    key = (kind, ticker.upper())
+    now = time.monotonic()
+    with _yf_lock:
+        hit = _yf_cache.get(key)
+        if hit and now - hit[0] < _YF_TTL_S:
+            _yf_cache.move_to_end(key)
+            return hit[1]
+        if hit:
+            del _yf_cache[key]
+    value = fetch()
+    if value:
+        with _yf_lock:
+            _yf_cache[key] = (now, value)
+            _yf_cache.move_to_end(key)
+            while len(_yf_cache) > _YF_MAX_ENTRIES:
+                _yf_cache.popitem(last=False)
+    return value
+
+
 def get_stock_price(ticker: str):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = _yf_cached("info", ticker, lambda: yf.Ticker(ticker).info)
         price = info.get("currentPrice") or info.get("regularMarketPrice") or info.get("previousClose")
         name = info.get("shortName", ticker.upper())
         if price:
@@ -64,8 +177,7 @@ def get_stock_price(ticker: str):
 
 def get_company_news(ticker: str):
     try:
-        stock = yf.Ticker(ticker)
-        news = stock.news or []
+        news = _yf_cached("news", ticker, lambda: yf.Ticker(ticker).news) or []
         headlines = [{"title": item["title"], "link": item.get("link", "#")} for item in news[:3] if "title" in item]
         if headlines:
             return {"type": "news_widget", "data": {"ticker": ticker.upper(), "headlines": headlines}}
@@ -87,6 +199,9 @@ def get_exchange_rate(base_currency: str, target_currency: str):
 
 
 def calculate_compound_interest(principal: float, rate: float, years: int):
+    """Scalars return the chat sentence; array-likes (scenario sweeps) return a NumPy array of amounts."""
+    if not (np.isscalar(principal) and np.isscalar(rate) and np.isscalar(years)):
+        return np.asarray(principal, dtype=np.float64) * (1 + np.asarray(rate, dtype=np.float64) / 100) ** np.asarray(years)
     amount = principal * (1 + rate / 100) ** years
     return f"The compound interest amount after {years} years is ${amount:.2f}."
 
@@ -97,18 +212,36 @@ def get_crypto_price(symbol: str):
     return f"The current price for {symbol.upper()} is ${price:.2f}."
 
 
+@njit(cache=True)
+def _mortgage_payment(principal, monthly_rate, num_payments):
+    if monthly_rate == 0.0:
+        return principal / num_payments
+    growth = (1.0 + monthly_rate) ** num_payments
+    return principal * monthly_rate * growth / (growth - 1.0)
+
+
+def _mortgage_payment_array(principal, monthly_rate, num_payments):
+    principal, monthly_rate, num_payments = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(monthly_rate, dtype=np.float64), np.asarray(num_payments, dtype=np.float64)
+    )
+    growth = (1.0 + monthly_rate) ** num_payments
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortized = principal * monthly_rate * growth / (growth - 1.0)
+    return np.where(monthly_rate == 0.0, principal / num_payments, amortized)
+
+
 def calculate_mortgage_payment(principal: float, annual_rate: float, years: int):
-    monthly_rate = annual_rate / 100 / 12
-    num_payments = years * 12
-    if monthly_rate == 0:
-        payment = principal / num_payments
-    else:
-        payment = principal * (monthly_rate * (1 + monthly_rate) ** num_payments) / (
-            (1 + monthly_rate) ** num_payments - 1
-        )
+    """Scalars return the chat sentence; array-likes (scenario sweeps) return a NumPy array of payments."""
+    if not (np.isscalar(principal) and np.isscalar(annual_rate) and np.isscalar(years)):
+        return _mortgage_payment_array(principal, np.asarray(annual_rate, dtype=np.float64) / 100 / 12, np.asarray(years) * 12)
+    payment = _mortgage_payment(float(principal), annual_rate / 100 / 12, float(years * 12))
     return f"The monthly mortgage payment is ${payment:.2f}."
 
 
+# Compile the JIT kernel at import so the first chat request doesn't pay for it
+_mortgage_payment(1.0, 0.01, 12.0)
+
+
 FINANCE_TOOLS = [
     {"name": "get_stock_price", "description": "Get the current stock price for a given ticker symbol.", "parameters": {"type": "object", "properties": {"ticker": {"type": "string", "description": "The stock ticker symbol, e.g., AAPL."}}, "required": ["ticker"]}},
     {"name": "get_company_news", "description": "Get the latest news headlines for a company.", "parameters": {"type": "object", "properties": {"ticker": {"type": "string", "description": "The stock ticker symbol."}}, "required": ["ticker"]}},
@@ -119,14 +252,39 @@ FINANCE_TOOLS = [
     {"name": "calculate_mortgage_payment", "description": "Calculate the monthly mortgage payment.", "parameters": {"type": "object", "properties": {"principal": {"type": "number"}, "annual_rate": {"type": "number"}, "years": {"type": "integer"}}, "required": ["principal", "annual_rate", "years"]}},
 ]
 
+def _unknown_tool(**_):
+    return {"type": "text", "data": "Unknown tool."}
+
+
+# Text-result tools wrapped with explicit parameters (no **kw repacking per call).
+def _calc_roi_tool(initial_value, final_value):
+    return {"type": "text", "data": calculate_roi(initial_value, final_value)}
+
+
+def _exchange_rate_tool(base_currency, target_currency):
+    return {"type": "text", "data": get_exchange_rate(base_currency, target_currency)}
+
+
+def _compound_interest_tool(principal, rate, years):
+    return {"type": "text", "data": calculate_compound_interest(principal, rate, years)}
+
+
+def _crypto_price_tool(symbol):
+    return {"type": "text", "data": get_crypto_price(symbol)}
+
+
+def _mortgage_payment_tool(principal, annual_rate, years):
+    return {"type": "text", "data": calculate_mortgage_payment(principal, annual_rate, years)}
+
+
 TOOL_HANDLERS = {
     "get_stock_price": get_stock_price,
     "get_company_news": get_company_news,
-    "calculate_roi": lambda **kw: {"type": "text", "data": calculate_roi(**kw)},
-    "get_exchange_rate": lambda **kw: {"type": "text", "data": get_exchange_rate(**kw)},
-    "calculate_compound_interest": lambda **kw: {"type": "text", "data": calculate_compound_interest(**kw)},
-    "get_crypto_price": lambda **kw: {"type": "text", "data": get_crypto_price(**kw)},
-    "calculate_mortgage_payment": lambda **kw: {"type": "text", "data": calculate_mortgage_payment(**kw)},
+    "calculate_roi": _calc_roi_tool,
+    "get_exchange_rate": _exchange_rate_tool,
+    "calculate_compound_interest": _compound_interest_tool,
+    "get_crypto_price": _crypto_price_tool,
+    "calculate_mortgage_payment": _mortgage_payment_tool,
 }
 
 # Hub tools: search the library corpus (syllabi, timelines, notes)
@@ -145,7 +303,10 @@ HUB_TOOLS = [
 
 def search_hub(query: str):
     """Handler: search corpus and return text for the model. Includes files_touched for sidebar."""
-    results = retrieval_search(query, top_k=5)
+    q = query.strip()
+    if len(q) < 2:
+        return {"type": "text", "data": "Query too short. Try something like 'quiz timeline' or 'syllabus'.", "files_touched": []}
+    results = retrieval_search(q, top_k=5)
     if not results:
         return {"type": "text", "data": "No matching content found in the library. Try indexing files first (set library root and run Index).", "files_touched": []}
     parts = [f"**{r['path']}**: {r['snippet']}" for r in results]
@@ -169,15 +330,100 @@ def _search_hub_handler(**kw):
 TOOL_HANDLERS["search_hub"] = _search_hub_handler
 
 
-def get_chat_tools():
-    """Tools for chat: finance + hub if library root is set."""
-    tools = list(FINANCE_TOOLS)
-    if library_config.get_library_root():
-        tools = list(HUB_TOOLS) + tools
-    return tools
+# Both tool sets are fixed at import; hand out shared tuples rather than building lists per request.
+_TOOLS_NO_HUB = tuple(FINANCE_TOOLS)
+_TOOLS_WITH_HUB = tuple(HUB_TOOLS) + tuple(FINANCE_TOOLS)
 
 
-conversation_history = []
+def get_chat_tools():
+    """Tools for chat: finance + hub if library root is set. Shared and read-only; copy before mutating."""
+    return _TOOLS_WITH_HUB if library_config.get_library_root() else _TOOLS_NO_HUB
+
+
+
+# Per-session chat history keyed by the X-Session-Id header ("default" when absent), bounded per
+# session. Sessions idle for longer than _SESSION_IDLE_S are dropped on a later request.
+_HISTORY_MAXLEN = 32
+_SESSION_IDLE_S = 3600.0
+_sessions = {}  # session id -> (last_used, deque)
+_sessions_pruned_at = 0.0
+
+
+def _session_history(request: Request) -> deque:
+    """Return the history deque for this request's session, pruning idle sessions once a minute."""
+    global _sessions_pruned_at
+    sid = request.headers.get("X-Session-Id") or "default"
+    now = time.monotonic()
+    if now - _sessions_pruned_at > 60:
+        for stale in [k for k, (used, _) in _sessions.items() if now - used > _SESSION_IDLE_S]:
+            del _sessions[stale]
+        _sessions_pruned_at = now
+    entry = _sessions.get(sid)
+    history = entry[1] if entry else deque(maxlen=_HISTORY_MAXLEN)
+    _sessions[sid] = (now, history)
+    return history
+
+
+# ---- Model call micro-batching ----
+# A lone request is dispatched at once; when several are already queued, requests arriving within
+# CHAT_BATCH_WINDOW_MS are drained together. Identical requests (same message, tool set,
+# force_local) in a batch share a single model call. Distinct calls run concurrently in the
+# threadpool, so one slow cloud fallback does not hold up other chats; the native Cactus handle is
+# serialized separately by main._cactus_call_lock.
+_BATCH_WINDOW_S = float(os.getenv("CHAT_BATCH_WINDOW_MS", "20")) / 1000
+_BATCH_MAX = 16
+_model_queue: "asyncio.Queue | None" = None
+_batcher_task: "asyncio.Task | None" = None
+_batch_tasks = set()  # strong refs so running batches aren't garbage-collected
+
+
+async def _run_group(fn, futures):
+    try:
+        result = await run_in_threadpool(fn)
+    except Exception as exc:
+        for fut in futures:
+            if not fut.done():
+                fut.set_exception(exc)
+        return
+    for fut in futures:
+        if not fut.done():
+            # Each caller gets its own top-level dict (chat() annotates "source")
+            fut.set_result(dict(result))
+
+
+async def _model_batcher():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _model_queue.get()]
+        if not _model_queue.empty():
+            deadline = loop.time() + _BATCH_WINDOW_S
+            while len(batch) < _BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_model_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        groups = {}
+        for key, fn, fut in batch:
+            groups.setdefault(key, (fn, []))[1].append(fut)
+        # gather schedules the groups and returns at once, so the batcher keeps draining while they run
+        task = asyncio.gather(*(_run_group(fn, futs) for fn, futs in groups.values()))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+
+async def _run_model(key, fn):
+    """Queue a model invocation for the batcher and await its result."""
+    global _model_queue, _batcher_task
+    loop = asyncio.get_running_loop()
+    if _batcher_task is None or _batcher_task.done() or _batcher_task.get_loop() is not loop:
+        _model_queue = asyncio.Queue()
+        _batcher_task = loop.create_task(_model_batcher())
+    fut = loop.create_future()
+    await _model_queue.put((key, fn, fut))
+    return await fut
 
 
 @app.get("/health")
@@ -200,6 +446,14 @@ def get_library_root():
     return {"root": library_config.get_library_root()}
 
 
+def _set_library_root(path: str) -> None:
+    """Switch library roots, dropping the RAG model and retrieval caches built for the old one."""
+    previous = library_config.get_library_root()
+    library_config.set_library_root(path)
+    if library_config.get_library_root() != previous:
+        reset_rag_model()
+
+
 @app.put("/api/library/root")
 async def put_library_root(request: Request):
     try:
@@ -212,7 +466,7 @@ async def put_library_root(request: Request):
     if not raw:
         return {"root": library_config.get_library_root(), "ok": False, "error": "No path provided"}
     normalized = _normalize_path(raw)
-    library_config.set_library_root(normalized)
+    _set_library_root(normalized)
     return {"root": library_config.get_library_root(), "ok": True}
 
 
@@ -230,6 +484,26 @@ def library_status():
     return get_index_status()
 
 
+def _count_files(root: str) -> int:
+    """
+    Count regular files under root. scandir yields the entry type with the listing, so no extra stat
+    per file. Unreadable directories are skipped (as rglob did) instead of failing the whole count.
+    """
+    total = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        total += 1
+        except OSError:
+            continue
+    return total
+
+
 @app.post("/api/library/validate")
 async def validate_path(request: Request):
     """Validate that a path exists and is a directory (path sent in body; if omitted, use current root)."""
@@ -247,7 +521,7 @@ async def validate_path(request: Request):
     if not os.path.isdir(path):
         return {"ok": False, "error": f"Not a directory (resolved: {path})", "path": path}
     try:
-        count = sum(1 for _ in Path(path).rglob("*") if _.is_file())
+        count = await asyncio.to_thread(_count_files, path)
     except Exception as e:
         return {"ok": False, "error": f"Cannot read directory: {e}", "path": path}
     return {"ok": True, "path": path, "exists": True, "is_dir": True, "file_count": count}
@@ -277,6 +551,15 @@ def suggested_roots():
     return {"roots": out}
 
 
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+async def _copy_upload(upload: UploadFile, out) -> None:
+    """Stream an UploadFile into an aiofiles handle in fixed-size chunks."""
+    while chunk := await upload.read(_UPLOAD_CHUNK_SIZE):
+        await out.write(chunk)
+
+
 @app.post("/api/library/upload")
 async def upload_library(files: list[UploadFile] = File("files")):
     """
@@ -294,20 +577,63 @@ async def upload_library(files: list[UploadFile] = File("files")):
         safe = f.filename.replace("..", "").lstrip("/")
         path = upload_dir / safe
         path.parent.mkdir(parents=True, exist_ok=True)
-        content = await f.read()
-        path.write_bytes(content)
-    library_config.set_library_root(str(upload_dir))
+        async with aiofiles.open(path, "wb") as out:
+            await _copy_upload(f, out)
+    _set_library_root(str(upload_dir))
     status = run_index(str(upload_dir))
     return {"ok": True, "root": str(upload_dir), "status": status, "files_received": len(files)}
 
 
+_CHAT_SYSTEM_INSTRUCTION = "You are Deep-Focus, a helpful macOS executive assistant. Answer the user conversationally. If the user asks something you could use tools for, suggest they try a specific question like 'What is the stock price of AAPL?' or 'Search my library for quiz timeline'."
+# Opt-in (CHAT_SPECULATIVE_CLOUD=1): starts a Gemini text reply alongside every non-forced model
+# call. Once started the request always completes and is billed, even when the turn ends up as a
+# local tool call or local text, so it trades API cost for latency on the no-tool path.
+_SPECULATIVE_CLOUD_TEXT = os.getenv("CHAT_SPECULATIVE_CLOUD", "0") == "1"
+
+
+def _cloud_text_reply(user_msg: str, cancelled: threading.Event) -> str:
+    """Conversational Gemini reply for turns without a tool call. Returns "" on error or if cancelled."""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    # Only helps if the model result arrived before this thread got scheduled
+    if not api_key or cancelled.is_set():
+        return ""
+    # Shares the Gemini rate limit with generate_cloud; over it, the caller uses the static fallback
+    if not _take_cloud_slot():
+        return ""
+    try:
+        from google.genai import types as _types
+        _resp = get_gemini_client(api_key).models.generate_content(
+            model="gemini-2.0-flash",
+            contents=user_msg,
+            config=_types.GenerateContentConfig(system_instruction=_CHAT_SYSTEM_INSTRUCTION),
+        )
+        return _resp.text or ""
+    except Exception as _e:
+        # RESOURCE_EXHAUSTED falls through to the static fallback silently
+        if "RESOURCE_EXHAUSTED" not in str(_e):
+            print(f"CLOUD TEXT ERROR: {_e}")
+        return ""
+
+
+def _drop_cloud_text(task, cancelled: threading.Event) -> None:
+    """Discard a speculative cloud text reply. A request already sent still completes (and is billed)."""
+    if task is not None:
+        cancelled.set()
+        task.cancel()
+
+
+async def _run_tool_call(call):
+    """Run one model-issued tool call off the event loop (handlers do blocking I/O)."""
+    handler = TOOL_HANDLERS.get(call["name"], _unknown_tool)
+    return await run_in_threadpool(handler, **call["arguments"])
+
+
 @app.post("/api/chat")
 async def chat(request: Request):
-    global conversation_history
     try:
         data = await request.json()
     except Exception:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={
                 "response": "Invalid or missing request body. Send JSON: { \"message\": \"your question\", \"force_local\": false }",
@@ -321,7 +647,7 @@ async def chat(request: Request):
     force_local = data.get("force_local", False)
 
     if not user_msg:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={
                 "response": "Message is required. Send a question about your library, stock prices, or calculations.",
@@ -330,28 +656,34 @@ async def chat(request: Request):
             },
         )
 
+    conversation_history = _session_history(request)
     if user_msg.lower() == "clear":
-        conversation_history = []
+        conversation_history.clear()
         return {"response": "Conversation cleared!", "metrics": None, "files_touched": []}
 
-    conversation_history.append({"role": "user", "content": user_msg})
-
     # CRITICAL: Send only the CURRENT message to the models.
     # The full conversation_history caused models to re-emit old tool results.
     current_messages = [{"role": "user", "content": user_msg}]
 
     tools = get_chat_tools()
+    batch_key = (user_msg, bool(force_local), tools is _TOOLS_WITH_HUB)
+    # With CHAT_SPECULATIVE_CLOUD=1 the cloud text reply starts next to the model call, so the
+    # no-tool/no-text path costs max(model, cloud) instead of model + cloud.
+    cloud_text_cancelled = threading.Event()
+    cloud_text_task = None
+    if not force_local and _SPECULATIVE_CLOUD_TEXT and os.environ.get("GEMINI_API_KEY"):
+        cloud_text_task = asyncio.ensure_future(run_in_threadpool(_cloud_text_reply, user_msg, cloud_text_cancelled))
     try:
         if force_local:
-            result = generate_cactus(current_messages, tools)
+            result = await _run_model(batch_key, lambda: generate_cactus(current_messages, tools))
             result["source"] = "on-device (forced)"
         else:
-            result = generate_hybrid(current_messages, tools)
+            result = await _run_model(batch_key, lambda: generate_hybrid(current_messages, tools))
     except Exception as exc:
+        _drop_cloud_text(cloud_text_task, cloud_text_cancelled)
         import traceback
         traceback.print_exc()
-        conversation_history.pop()  # rollback
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "response": f"Backend error during generation: {exc}. Check that cactus is authenticated and the model is downloaded.",
@@ -362,13 +694,18 @@ async def chat(request: Request):
 
     calls = result.get("function_calls", [])
     files_touched = []
+    if calls or (result.get("response") or "").strip():
+        _drop_cloud_text(cloud_text_task, cloud_text_cancelled)
     if calls:
         blocks = [{"type": "text", "content": "Here are the results:\n"}]
         text_for_history = "Here are the results:\n"
-        for c in calls:
-            name, args = c["name"], c["arguments"]
+        # Run all tool calls concurrently in the threadpool (yfinance etc. block), then fold in order.
+        results = await asyncio.gather(*(_run_tool_call(c) for c in calls), return_exceptions=True)
+        for c, res in zip(calls, results):
+            name = c["name"]
             try:
-                res = TOOL_HANDLERS.get(name, lambda **_: {"type": "text", "data": "Unknown tool."})(**args)
+                if isinstance(res, Exception):
+                    raise res
                 if isinstance(res, dict) and res.get("files_touched"):
                     files_touched.extend(res["files_touched"])
                 blocks.append(res if isinstance(res, dict) and "type" in res else {"type": "text", "content": str(res)})
@@ -376,6 +713,8 @@ async def chat(request: Request):
             except Exception as e:
                 blocks.append({"type": "text", "content": f"- **{name}**: Error - {e}"})
                 text_for_history += f"- **{name}**: Error - {e}\n"
+        # History only records completed turns, so a failed model call leaves it untouched
+        conversation_history.append({"role": "user", "content": user_msg})
         conversation_history.append({"role": "assistant", "content": text_for_history})
         agent_reply = blocks
 
@@ -400,34 +739,19 @@ async def chat(request: Request):
         text_reply = local_text
         text_source = "on-device (text)"
     elif not force_local:
-        # Try Gemini cloud for text generation
-        try:
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if api_key:
-                from google import genai as _genai
-                from google.genai import types as _types
-                _client = _genai.Client(api_key=api_key)
-                _resp = _client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=user_msg,
-                    config=_types.GenerateContentConfig(
-                        system_instruction="You are Deep-Focus, a helpful macOS executive assistant. Answer the user conversationally. If the user asks something you could use tools for, suggest they try a specific question like 'What is the stock price of AAPL?' or 'Search my library for quiz timeline'.",
-                    ),
-                )
-                text_reply = _resp.text or ""
-                text_source = "cloud (text)"
-        except Exception as _e:
-            err_str = str(_e)
-            if "RESOURCE_EXHAUSTED" in err_str:
-                text_reply = ""  # fall through to static fallback
-            else:
-                text_reply = ""
-                print(f"CLOUD TEXT ERROR: {_e}")
+        # Gemini text reply: usually already started alongside the model call (and often done)
+        if cloud_text_task is not None:
+            text_reply = await cloud_text_task
+        else:
+            text_reply = await run_in_threadpool(_cloud_text_reply, user_msg, cloud_text_cancelled)
+        if text_reply:
+            text_source = "cloud (text)"
 
     if not text_reply:
         text_reply = "I can help with stock prices, calculations, exchange rates, and searching your indexed files. Try asking something like 'What is the stock price of AAPL?' or 'Search my library for quiz timeline'."
         text_source = "static fallback"
 
+    conversation_history.append({"role": "user", "content": user_msg})
     conversation_history.append({"role": "assistant", "content": text_reply})
     return {
         "response": text_reply,
@@ -442,12 +766,13 @@ async def chat(request: Request):
 
 @app.post("/api/transcribe")
 async def transcribe(audio: UploadFile = File(...)):
-    content = await audio.read()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(content)
+    # transcribe_audio takes a path, so stream the upload to a temp file in 1 MiB chunks
+    # (flat memory, no sync disk writes on the loop) and run Whisper off the event loop.
+    async with aiofiles.tempfile.NamedTemporaryFile("wb", suffix=".wav", delete=False) as tmp:
         tmp_path = tmp.name
+        await _copy_upload(audio, tmp)
     try:
-        text = transcribe_audio(tmp_path)
+        text = await run_in_threadpool(transcribe_audio, tmp_path)
         return {"text": text.strip()}
     finally:
         if os.path.exists(tmp_path):
@@ -456,5 +781,16 @@ async def transcribe(audio: UploadFile = File(...)):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/http stay at uvicorn's "auto", which already picks uvloop + httptools when installed
+    # (uvicorn[standard]) and falls back to asyncio/h11 otherwise. Library root, index status and chat
+    # sessions are per-process state, so the default stays at one worker; WEB_CONCURRENCY=auto
+    # (one per core) suits a fixed LIBRARY_ROOT where clients send a stable X-Session-Id.
+    workers = os.getenv("WEB_CONCURRENCY", "1")
+    uvicorn.run(
+        "backend.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=(os.cpu_count() or 1) if workers == "auto" else int(workers),
+        log_level=os.getenv("UVICORN_LOG_LEVEL", "warning"),
+    )
 
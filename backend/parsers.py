@@ -1,6 +1,8 @@
 """
 Parsers: extract searchable text from supported file formats.
 """
+import hashlib
+import os
 from pathlib import Path
 from typing import Optional
 
@@ -10,7 +12,10 @@ SUPPORTED_EXTENSIONS = {
     ".csv", ".xlsx", ".xls",
 }
 
-def parse_file(file_path: Path) -> Optional[str]:
+# Below this many extracted characters per page, FAST is assumed to have missed the text.
+_MIN_PDF_CHARS_PER_PAGE = 200
+
+def parse_file(file_path: Path, cache_dir: Optional[Path] = None) -> Optional[str]:
     path = Path(file_path)
     suffix = path.suffix.lower()
     if suffix not in SUPPORTED_EXTENSIONS:
@@ -18,7 +23,9 @@ def parse_file(file_path: Path) -> Optional[str]:
 
     try:
         if suffix == ".pdf":
-            return _parse_pdf_unstructured(path)
+            if cache_dir is None:
+                return _parse_pdf_unstructured(path)
+            return _parse_pdf_cached(path, Path(cache_dir))
         # ... (keep your other existing docx, csv, xlsx parsers here) ...
         
         if suffix in (".py", ".js", ".ts", ".go", ".md", ".txt", ".json", ".yaml", ".yml"):
@@ -27,16 +34,43 @@ def parse_file(file_path: Path) -> Optional[str]:
         return None
     return None
 
+def pdf_cache_path(path: Path, cache_dir: Path) -> Path:
+    """Cache file for a PDF's extracted text, keyed on its (path, size, mtime)."""
+    st = path.stat()
+    key = f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+    return cache_dir / ("pdf_" + hashlib.sha1(key.encode("utf-8")).hexdigest() + ".txt")
+
+def _parse_pdf_cached(path: Path, cache_dir: Path) -> Optional[str]:
+    """PDF text, reused from cache_dir while the file's (path, size, mtime) is unchanged."""
+    cached = pdf_cache_path(path, cache_dir)
+    if cached.exists():
+        return cached.read_text(encoding="utf-8")
+    text = _parse_pdf_unstructured(path)
+    # Don't cache the "install unstructured" placeholder, or it would outlive the install
+    if text and not text.startswith("[PDF not extracted"):
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, cached)
+    return text
+
 def _parse_pdf_unstructured(path: Path) -> Optional[str]:
     """Extract text and tables from PDF using Unstructured (No Langchain/Ollama)."""
     try:
         from unstructured.partition.pdf import partition_pdf
         from unstructured.partition.utils.constants import PartitionStrategy
         
+        # FAST (pdfminer only) is enough for text-native PDFs; fall back to HI_RES (layout model
+        # per page) only when FAST finds too little text, e.g. scans or image-heavy pages.
         elements = partition_pdf(
             filename=str(path),
-            strategy=PartitionStrategy.HI_RES,
+            strategy=PartitionStrategy.FAST,
         )
+        page_count = max((el.metadata.page_number or 1 for el in elements), default=1)
+        if sum(len(el.text or "") for el in elements) < _MIN_PDF_CHARS_PER_PAGE * page_count:
+            elements = partition_pdf(
+                filename=str(path),
+                strategy=PartitionStrategy.HI_RES,
+            )
         
         text_blocks = []
         for el in elements:
@@ -2,9 +2,18 @@
 Retrieval: search the corpus (parsed text in cache_dir) by query.
 Returns top-k chunks or file paths + snippets for hub tool handlers.
 """
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import json
+import os
+import re
+import threading
+
+from . import bm25_index
 
 def _get_cache_dir() -> Path:
     from .indexer import get_cache_dir
@@ -15,16 +24,133 @@ def _get_cache_dir() -> Path:
 
 _rag_model = None
 _rag_model_root: Optional[str] = None
+# Guards the native RAG handle: init, destroy and anything running on it. Re-entrant so callers
+# holding it can still go through _get_rag_model / _destroy_rag_model.
+_rag_lock = threading.RLock()
+# Root whose corpus was last validated, so a failing cactus_init doesn't re-validate on every query
+_rag_validated_root: Optional[str] = None
+
+# Chunk text cache: path -> (mtime_ns, text). Bounded LRU so hot snippets skip disk reads.
+_DOC_CACHE_MAX = 512
+_doc_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_doc_cache_lock = threading.Lock()
+
+# Snippet reads for keyword hits run here so disk waits overlap (file reads release the GIL).
+_IO_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4), thread_name_prefix="retrieval-io")
+
+
+def _read_chunk_text(txt_path: Path) -> Optional[str]:
+    """Read a corpus chunk, served from memory while its mtime is unchanged. None if missing."""
+    key = str(txt_path)
+    try:
+        mtime = txt_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        with _doc_cache_lock:
+            _doc_cache.pop(key, None)
+        return None
+    with _doc_cache_lock:
+        cached = _doc_cache.get(key)
+        if cached and cached[0] == mtime:
+            _doc_cache.move_to_end(key)
+            return cached[1]
+    text = txt_path.read_text(encoding="utf-8", errors="replace")
+    with _doc_cache_lock:
+        _doc_cache[key] = (mtime, text)
+        if len(_doc_cache) > _DOC_CACHE_MAX:
+            _doc_cache.popitem(last=False)
+    return text
+
+
+# Files above this size are not read whole for a snippet: one pread of _WINDOW_BYTES around the
+# indexed offset is enough (indexer chunks are ~1 KB, so this only kicks in for oversized files).
+_WINDOW_READ_MIN = 64 * 1024
+_WINDOW_BYTES = 4096
+
+
+def _read_chunk_window(txt_path: Path, offset: int) -> Optional[tuple]:
+    """(text, start offset) to cut a snippet from near offset. None if the file is missing."""
+    try:
+        size = txt_path.stat().st_size
+    except FileNotFoundError:
+        return None
+    if size <= _WINDOW_READ_MIN:
+        text = _read_chunk_text(txt_path)
+        return None if text is None else (text, 0)
+    # Offsets are character positions, so this window is exact for ASCII and approximate otherwise;
+    # callers re-anchor on a keyword match inside the window.
+    start = max(0, offset - _WINDOW_BYTES // 2)
+    fd = os.open(txt_path, os.O_RDONLY)
+    try:
+        buf = os.pread(fd, _WINDOW_BYTES, start)
+    finally:
+        os.close(fd)
+    return buf.decode("utf-8", errors="replace"), start
+
+
+def _destroy_rag_model() -> None:
+    """Free the native Cactus model (weights + corpus index) instead of just dropping the handle."""
+    global _rag_model
+    with _rag_lock:
+        if _rag_model is not None:
+            try:
+                from cactus import cactus_destroy
+                cactus_destroy(_rag_model)
+            except Exception as e:
+                print(f"WARNING: cactus_destroy failed: {e}")
+        _rag_model = None
 
 
 def reset_rag_model() -> None:
     """Reset cached RAG model so it can be rebuilt for a new corpus."""
-    global _rag_model, _rag_model_root
-    _rag_model = None
-    _rag_model_root = None
+    global _rag_model_root, _rag_validated_root, _faiss_cache
+    with _rag_lock:
+        _destroy_rag_model()
+        _rag_model_root = None
+        _rag_validated_root = None
+        _faiss_cache = None
+    with _doc_cache_lock:
+        _doc_cache.clear()
+    _validation_cache.clear()
+    _make_snippet.cache_clear()
+    clear_search_cache()
+
+# Indexer chunk files are "<safe name>_chunk<N>.txt"; other .txt files in the cache (e.g. the
+# per-PDF text cache) are not corpus chunks.
+_CHUNK_FILE_RE = re.compile(r"_chunk\d+\.txt$")
+
+
+def _list_corpus_files(cache_dir: Path) -> list:
+    """Chunk files in cache_dir as os.DirEntry objects (one scandir, no Path objects or globbing)."""
+    with os.scandir(cache_dir) as it:
+        return [e for e in it if _CHUNK_FILE_RE.search(e.name) and e.is_file()]
+
+
+def _chunk_has_content(entry) -> bool:
+    """The one content check for corpus chunks (validation and verify_corpus): more than 200 bytes, by size alone."""
+    return entry.stat().st_size > 200
+
+
+# (cache_dir, manifest mtime_ns) -> validation result; a re-index writes a new manifest
+_validation_cache: Dict[tuple, tuple] = {}
+
 
 def _validate_corpus_dir(cache_dir: Path) -> tuple[bool, str]:
-    """Validate that corpus directory exists and has content files."""
+    """Validate that corpus directory exists and has content files (memoized per manifest version)."""
+    try:
+        key = (str(cache_dir), (cache_dir / "manifest.json").stat().st_mtime_ns)
+    except OSError:
+        key = None
+    if key in _validation_cache:
+        return _validation_cache[key]
+    result = _validate_corpus_dir_uncached(cache_dir)
+    if key is not None:
+        for stale in [k for k in _validation_cache if k[0] == key[0]]:
+            del _validation_cache[stale]
+        _validation_cache[key] = result
+    return result
+
+
+def _validate_corpus_dir_uncached(cache_dir: Path) -> tuple[bool, str]:
     if not cache_dir.exists():
         return False, f"Corpus directory does not exist: {cache_dir}"
     
@@ -37,23 +163,17 @@ def _validate_corpus_dir(cache_dir: Path) -> tuple[bool, str]:
         return False, "Manifest file not found. Please re-index your library."
     
     try:
-        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        manifest = bm25_index.load_manifest(manifest_path)
         if not manifest:
             return False, "Manifest is empty. Please re-index your library."
         
         # Check if at least some corpus files exist
-        corpus_files = [f for f in cache_dir.glob("*.txt") if f.name != "manifest.json"]
+        corpus_files = _list_corpus_files(cache_dir)
         if not corpus_files:
             return False, "No corpus files found. Please re-index your library."
         
-        # Check if files have actual content (not just metadata)
-        content_found = False
-        for txt_file in corpus_files[:5]:  # Sample first 5 files
-            content = txt_file.read_text(encoding="utf-8", errors="replace")
-            # Check if content has more than just path/name metadata
-            if len(content) > 200 and "\n\n" in content:
-                content_found = True
-                break
+        # Check if files have actual content (not just metadata); sizes only, no reads
+        content_found = any(_chunk_has_content(txt_file) for txt_file in corpus_files[:5])
         
         if not content_found:
             return False, "Corpus files appear to have no content. Please re-index with content extraction enabled."
@@ -65,7 +185,7 @@ def _validate_corpus_dir(cache_dir: Path) -> tuple[bool, str]:
 
 def _get_rag_model():
     """Lazily initialize a Cactus model for RAG with validation."""
-    global _rag_model, _rag_model_root
+    global _rag_model, _rag_model_root, _rag_validated_root
     from . import config as library_config
     from cactus import cactus_init, cactus_get_last_error
     import os
@@ -74,34 +194,131 @@ def _get_rag_model():
     if not root:
         return None
 
-    if _rag_model is None or _rag_model_root != root:
-        # Use the same weights as main.py
-        cwd = os.getcwd()
-        weights_path = os.path.join(cwd, "cactus/weights/functiongemma-270m-it")
-        cache_dir = _get_cache_dir()
+    # One thread initializes; concurrent first queries wait instead of each loading a handle
+    with _rag_lock:
+        if _rag_model is None or _rag_model_root != root:
+            # Use the same weights as main.py (FUNCTIONGEMMA_PATH selects a quantized build)
+            cwd = os.getcwd()
+            weights_path = os.environ.get("FUNCTIONGEMMA_PATH") or os.path.join(cwd, "cactus/weights/functiongemma-270m-it")
+            cache_dir = _get_cache_dir()
         
-        # Validate corpus before initializing
-        is_valid, validation_msg = _validate_corpus_dir(cache_dir)
-        if not is_valid:
-            print(f"WARNING: Corpus validation failed: {validation_msg}")
-            print("RAG queries may not work properly. Please re-index your library.")
-        else:
-            print(f"DEBUG: {validation_msg}")
+            # Validate corpus before the first initialization for this root
+            if _rag_validated_root != root:
+                is_valid, validation_msg = _validate_corpus_dir(cache_dir)
+                if not is_valid:
+                    print(f"WARNING: Corpus validation failed: {validation_msg}")
+                    print("RAG queries may not work properly. Please re-index your library.")
+                else:
+                    print(f"DEBUG: {validation_msg}")
+                _rag_validated_root = root
         
-        print(f"DEBUG: Initializing RAG model with corpus_dir: {cache_dir}")
-        _rag_model = cactus_init(weights_path, corpus_dir=str(cache_dir), cache_index=True)
+            # Switching roots: free the previous model before loading another copy of the weights
+            _destroy_rag_model()
+            _rag_model_root = None
+            print(f"DEBUG: Initializing RAG model with corpus_dir: {cache_dir}")
+            _rag_model = cactus_init(weights_path, corpus_dir=str(cache_dir), cache_index=True)
         
-        if _rag_model is None:
-            error_msg = cactus_get_last_error()
-            print(f"ERROR: Failed to initialize RAG model. Error: {error_msg}")
-            print(f"  Weights path: {weights_path}")
-            print(f"  Corpus dir: {cache_dir}")
-            return None
+            if _rag_model is None:
+                error_msg = cactus_get_last_error()
+                print(f"ERROR: Failed to initialize RAG model. Error: {error_msg}")
+                print(f"  Weights path: {weights_path}")
+                print(f"  Corpus dir: {cache_dir}")
+                return None
         
-        _rag_model_root = root
-        print(f"DEBUG: RAG model initialized successfully")
+            _rag_model_root = root
+            print(f"DEBUG: RAG model initialized successfully")
         
-    return _rag_model
+        return _rag_model
+
+# ---- Optional FAISS dense index (opt-in: DEEPFOCUS_FAISS=1, requires `pip install faiss-cpu`) ----
+# Chunks are embedded once with cactus_embed and stored in an HNSW graph next to manifest.json,
+# so a query is one embedding + an ~O(log N) graph search instead of a scan over the corpus.
+_FAISS_INDEX_FILE = "faiss.index"
+_FAISS_META_FILE = "faiss_meta.json"
+_faiss_cache: Optional[tuple] = None  # (cache_dir, manifest mtime_ns, index, entries)
+
+
+def _faiss_enabled() -> bool:
+    return os.environ.get("DEEPFOCUS_FAISS", "").strip().lower() in ("1", "true", "yes")
+
+
+def _get_faiss_index(model, cache_dir: Path):
+    """Load (or build and persist) the HNSW index for cache_dir, keyed on manifest mtime."""
+    global _faiss_cache
+    import faiss
+    import numpy as np
+    from cactus import cactus_embed
+
+    manifest_path = cache_dir / "manifest.json"
+    version = manifest_path.stat().st_mtime_ns
+    if _faiss_cache and _faiss_cache[0] == str(cache_dir) and _faiss_cache[1] == version:
+        return _faiss_cache[2], _faiss_cache[3]
+
+    index_path = cache_dir / _FAISS_INDEX_FILE
+    meta_path = cache_dir / _FAISS_META_FILE
+    index = None
+    entries: List[Dict[str, str]] = []
+    if index_path.exists() and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") == version:
+                index = faiss.read_index(str(index_path))
+                entries = meta["entries"]
+        except Exception as e:
+            print(f"WARNING: Could not load FAISS index, rebuilding: {e}")
+            index = None
+
+    if index is None:
+        manifest = bm25_index.load_manifest(manifest_path)
+        vectors = []
+        entries = []
+        for rel_path, name in bm25_index.manifest_chunk_files(manifest):
+            txt_path = cache_dir / name
+            if not txt_path.exists():
+                continue
+            text = txt_path.read_text(encoding="utf-8", errors="replace").strip()
+            if not text:
+                continue
+            vectors.append(cactus_embed(model, text, normalize=True))
+            entries.append({"path": rel_path, "file": name})
+        if not vectors:
+            return None, []
+        mat = np.asarray(vectors, dtype=np.float32)
+        # Inner product over L2-normalized vectors == cosine similarity.
+        index = faiss.IndexHNSWFlat(mat.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.add(mat)
+        faiss.write_index(index, str(index_path))
+        meta_path.write_text(json.dumps({"version": version, "entries": entries}), encoding="utf-8")
+        print(f"DEBUG: Built FAISS index over {len(entries)} chunks in {cache_dir}")
+
+    _faiss_cache = (str(cache_dir), version, index, entries)
+    return index, entries
+
+
+def _faiss_rag_query(model, query: str, top_k: int) -> List[Dict[str, Any]]:
+    """Drop-in for cactus_rag_query backed by the FAISS index. Returns [{ "text", "score" }]."""
+    import numpy as np
+    from cactus import cactus_embed
+
+    cache_dir = _get_cache_dir()
+    index, entries = _get_faiss_index(model, cache_dir)
+    if index is None:
+        return []
+    q = np.asarray([cactus_embed(model, query, normalize=True)], dtype=np.float32)
+    scores, ids = index.search(q, top_k)
+    out = []
+    for score, i in zip(scores[0], ids[0]):
+        if i < 0:
+            continue
+        entry = entries[i]
+        text = _read_chunk_text(cache_dir / entry["file"])
+        if text is None:
+            continue
+        # Same "path:" header the semantic result cleaning below already understands.
+        out.append({"text": f"path: {entry['path']}\n{text}", "score": float(score)})
+    return out
+
 
 def verify_corpus() -> Dict[str, Any]:
     """Verify corpus status and return diagnostic information."""
@@ -119,191 +336,296 @@ def verify_corpus() -> Dict[str, Any]:
         manifest_path = cache_dir / "manifest.json"
         if manifest_path.exists():
             try:
-                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                manifest = bm25_index.load_manifest(manifest_path)
                 result["files_indexed"] = len(manifest)
                 result["manifest_exists"] = True
             except:
                 result["manifest_exists"] = False
         
-        corpus_files = list(cache_dir.glob("*.txt"))
-        result["corpus_files_count"] = len([f for f in corpus_files if f.name != "manifest.json"])
+        corpus_files = _list_corpus_files(cache_dir)
+        result["corpus_files_count"] = len(corpus_files)
         
-        # Sample a file to check content
-        sample_files = [f for f in corpus_files if f.name != "manifest.json"][:3]
-        if sample_files:
-            sample_content = sample_files[0].read_text(encoding="utf-8", errors="replace")
-            result["sample_file_size"] = len(sample_content)
-            result["has_content"] = len(sample_content) > 200 and "\n\n" in sample_content
+        # Sample a file to check content (same check as validation; size from the directory entry)
+        if corpus_files:
+            sample = corpus_files[0]
+            result["sample_file_size"] = sample.stat().st_size
+            result["has_content"] = _chunk_has_content(sample)
     
     return result
 
 
+def _snippet_key(snippet: str) -> bytes:
+    """Case-insensitive dedup key: 8-byte BLAKE2b digest instead of storing lowercased snippets."""
+    return hashlib.blake2b(snippet.strip().casefold().encode("utf-8"), digest_size=8).digest()
+
+
+@lru_cache(maxsize=256)
+def _query_keywords(query: str) -> tuple:
+    """
+    Tokenize a query once: (keywords, compiled pattern matching any keyword as a whole word).
+    Words shorter than 3 chars and stopwords are dropped; if that leaves nothing (e.g. "what",
+    "how to"), every term is kept instead.
+    """
+    query = query.lower()
+    # Same tokenizer as the BM25 index, so query terms line up with postings
+    tokens = bm25_index.TOKEN_RE.findall(query)
+    keywords = [w for w in tokens if len(w) > 2 and w not in bm25_index.STOPWORDS]
+    if not keywords: keywords = tokens
+    if not keywords: keywords = [query]
+    keywords = tuple(dict.fromkeys(keywords))
+    
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE)
+    return keywords, pattern
+
+
+def _strip_metadata(text: str) -> tuple:
+    """Single pass over lines: (value of the first "path:" line or None, text minus leading path:/name: lines)."""
+    path = None
+    cleaned_lines = []
+    skip_metadata = True
+    for line in text.split("\n"):
+        is_path = line[:5] == "path:"
+        if is_path and path is None:
+            path = line[5:].strip()
+        if skip_metadata and (is_path or line[:5] == "name:"):
+            continue
+        skip_metadata = False
+        cleaned_lines.append(line)
+    return path, "\n".join(cleaned_lines)
+
+
+# Nearby keyword offsets share a cached snippet (the snippet re-anchors on a regex match anyway)
+_SNIPPET_BUCKET = 256
+
+
+def _keyword_snippet(txt_path: Path, first_idx: int, keyword_re) -> Optional[str]:
+    """Cleaned snippet around the earliest keyword hit in one chunk file. None if the file is gone."""
+    try:
+        mtime = txt_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _make_snippet(str(txt_path), mtime, first_idx // _SNIPPET_BUCKET, keyword_re)
+
+
+@lru_cache(maxsize=512)
+def _make_snippet(txt_path: str, mtime: int, first_idx_bucket: int, keyword_re) -> Optional[str]:
+    """Memoized per (file, mtime, offset bucket, query pattern), so repeated winners skip the read."""
+    first_idx = first_idx_bucket * _SNIPPET_BUCKET
+    window = _read_chunk_window(Path(txt_path), first_idx)
+    if window is None:
+        return None
+    text, window_start = window
+    first_idx = max(0, first_idx - window_start)
+
+    # Anchor on the earliest keyword hit in the original text (one regex pass);
+    # the index offset is into the lowercased text and only a fallback.
+    m = keyword_re.search(text)
+    if m: first_idx = m.start()
+
+    # Extract a better snippet around the keyword match
+    # Try to get a paragraph or section around the match
+    start = max(0, first_idx - 300)
+    end = min(len(text), first_idx + 500)
+
+    # Try to find sentence boundaries for cleaner snippets
+    snippet_text = text[start:end]
+
+    # Remove path/name metadata if present
+    _, snippet_text = _strip_metadata(snippet_text)
+
+    # Clean up whitespace
+    snippet = " ".join(snippet_text.split())
+    if len(snippet) > 800:
+        snippet = snippet[:800] + "..."
+    return snippet
+
+
 def search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """
-    Search corpus for query using a hybrid approach:
-    1. Try semantic search via Cactus engine.
-    2. Fallback/Supplement with keyword-based substring search.
-    Returns list of { "path", "snippet", "score" }.
+    Search corpus for query, memoized per (normalized query, top_k, corpus version).
+    The corpus version is the manifest's mtime, so re-indexing invalidates cached answers.
+    Degraded results (semantic search unavailable or empty, keyword search failed) are not cached.
     """
-    results = []
-    seen_snippets = set()
+    query_norm = " ".join(query.lower().split())
+    cache_dir = _get_cache_dir()
+    try:
+        version = (cache_dir / "manifest.json").stat().st_mtime_ns
+    except OSError:
+        version = None
+    key = (query_norm, top_k, str(cache_dir), version)
+    with _search_cache_lock:
+        cached = _search_cache.get(key)
+        if cached is not None:
+            _search_cache.move_to_end(key)
+            return [dict(r) for r in cached]
+    results, complete = _search_uncached(query_norm, top_k)
+    if complete and version is not None:
+        with _search_cache_lock:
+            _search_cache[key] = tuple(results)
+            if len(_search_cache) > _SEARCH_CACHE_MAX:
+                _search_cache.popitem(last=False)
+    return [dict(r) for r in results]
 
-    # 1. Semantic Search (Cactus)
-    model = _get_rag_model()
-    if model:
-        from cactus import cactus_rag_query, cactus_get_last_error
-        try:
-            print(f"DEBUG: Executing RAG query: '{query}' (top_k={top_k})")
-            raw_results = cactus_rag_query(model, query, top_k=top_k)
+
+_SEARCH_CACHE_MAX = 512
+_search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+
+def clear_search_cache() -> None:
+    """Drop memoized search results (called after re-indexing)."""
+    with _search_cache_lock:
+        _search_cache.clear()
+
+
+def _dense_search(query: str, top_k: int) -> tuple:
+    """
+    Semantic search via the Cactus RAG model (or FAISS over its embeddings), best first.
+    Returns (results, ok); ok is False when the model is unavailable, errored or returned nothing.
+    """
+    results = []
+    ok = False
+    # The native handle isn't safe for concurrent use (and a root switch may destroy it), so
+    # queries, the lazy FAISS build and embeddings on it are serialized with init/destroy.
+    with _rag_lock:
+        model = _get_rag_model()
+        if model:
+            from cactus import cactus_rag_query, cactus_get_last_error
+            try:
+                print(f"DEBUG: Executing RAG query: '{query}' (top_k={top_k})")
+                if _faiss_enabled():
+                    raw_results = _faiss_rag_query(model, query, top_k)
+                else:
+                    raw_results = cactus_rag_query(model, query, top_k=top_k)
             
-            if raw_results:
-                print(f"DEBUG: RAG query returned {len(raw_results)} results")
-                for i, r in enumerate(raw_results):
-                    snippet = r.get("text", "").strip()
-                    score = r.get("score", 0.9)
+                if raw_results:
+                    ok = True
+                    print(f"DEBUG: RAG query returned {len(raw_results)} results")
+                    for i, r in enumerate(raw_results):
+                        snippet = r.get("text", "").strip()
+                        score = r.get("score", 0.9)
                     
-                    if snippet:
-                        # Try to extract file path from snippet if it contains path metadata
-                        path = "Library Document"
-                        if "path:" in snippet:
-                            try:
-                                path_line = [line for line in snippet.split("\n") if line.startswith("path:")][0]
-                                path = path_line.replace("path:", "").strip()
-                            except:
-                                pass
+                        if snippet:
+                            # Extract the file path and strip leading path/name metadata in one pass
+                            path = "Library Document"
+                            if "path:" in snippet:
+                                found_path, cleaned_snippet = _strip_metadata(snippet)
+                                if found_path is not None:
+                                    path = found_path
+                                cleaned_snippet = cleaned_snippet.strip()
+                                if not cleaned_snippet:
+                                    cleaned_snippet = snippet  # Fallback to original if cleaning removed everything
                             
-                            # Clean up snippet: remove path/name metadata lines if they're at the start
-                            lines = snippet.split("\n")
-                            cleaned_lines = []
-                            skip_metadata = True
-                            for line in lines:
-                                if skip_metadata and (line.startswith("path:") or line.startswith("name:")):
-                                    continue
-                                skip_metadata = False
-                                cleaned_lines.append(line)
+                                # Limit snippet length for better readability
+                                if len(cleaned_snippet) > 1000:
+                                    cleaned_snippet = cleaned_snippet[:1000] + "..."
                             
-                            cleaned_snippet = "\n".join(cleaned_lines).strip()
-                            if not cleaned_snippet:
-                                cleaned_snippet = snippet  # Fallback to original if cleaning removed everything
-                            
-                            # Limit snippet length for better readability
-                            if len(cleaned_snippet) > 1000:
-                                cleaned_snippet = cleaned_snippet[:1000] + "..."
-                            
-                            results.append({
-                                "path": path,
-                                "snippet": cleaned_snippet,
-                                "score": score,
-                            })
-                            seen_snippets.add(cleaned_snippet.lower())
-                            print(f"DEBUG: Result {i+1}: path={path[:50]}, score={score:.3f}, snippet_len={len(cleaned_snippet)}")
-                    else:
-                        print(f"DEBUG: Result {i+1}: Empty snippet, skipping")
-            else:
-                error_msg = cactus_get_last_error()
-                if error_msg:
-                    print(f"WARNING: RAG SEMANTIC SEARCH returned no results. Error: {error_msg}")
+                                results.append({
+                                    "path": path,
+                                    "snippet": cleaned_snippet,
+                                    "score": score,
+                                })
+                                print(f"DEBUG: Result {i+1}: path={path[:50]}, score={score:.3f}, snippet_len={len(cleaned_snippet)}")
+                        else:
+                            print(f"DEBUG: Result {i+1}: Empty snippet, skipping")
                 else:
-                    print(f"INFO: RAG SEMANTIC SEARCH returned no results for query: '{query}'")
-                    print("DEBUG: This might indicate the corpus is empty or the query doesn't match any content.")
-        except Exception as e:
-            print(f"RAG SEMANTIC SEARCH ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+                    error_msg = cactus_get_last_error()
+                    if error_msg:
+                        print(f"WARNING: RAG SEMANTIC SEARCH returned no results. Error: {error_msg}")
+                    else:
+                        print(f"INFO: RAG SEMANTIC SEARCH returned no results for query: '{query}'")
+                        print("DEBUG: This might indicate the corpus is empty or the query doesn't match any content.")
+            except Exception as e:
+                print(f"RAG SEMANTIC SEARCH ERROR: {e}")
+                import traceback
+                traceback.print_exc()
+    return results, ok
 
-    # 2. Keyword Fallback (Substring / Token-based)
-    if len(results) < top_k:
-        print(f"DEBUG: Semantic search returned {len(results)} results, using keyword fallback to reach {top_k}")
-        try:
-            cache_dir = _get_cache_dir()
-            manifest_path = cache_dir / "manifest.json"
-            if manifest_path.exists():
-                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
-                print(f"DEBUG: Keyword search scanning {len(manifest)} files in manifest")
-                
-                # Tokenize query
-                import re
-                words = [w.lower() for w in re.findall(r'\w+', query) if len(w) > 2]
-                if not words: words = [query.lower()]
-                
-                # Simple stopword list
-                stopwords = {"the", "and", "for", "with", "from", "that", "this", "query", "search", "what", "is", "of", "in", "to", "a", "an"}
-                keywords = [w for w in words if w not in stopwords]
-                if not keywords: keywords = words
-                
-                print(f"DEBUG: Keyword search using keywords: {keywords}")
-                matches = []
-                for rel_path, safe_name in manifest.items():
-                    txt_path = cache_dir / safe_name
-                    if not txt_path.exists(): continue
-                    
-                    text = txt_path.read_text(encoding="utf-8", errors="replace")
-                    text_lower = text.lower()
-                    
-                    # Score by how many keywords were found
-                    found_count = 0
-                    first_idx = -1
-                    for kw in keywords:
-                        if kw in text_lower:
-                            found_count += 1
-                            if first_idx == -1: first_idx = text_lower.find(kw)
-                    
-                    if found_count > 0:
-                        # Success! Found at least one keyword.
-                        # Calculate a score based on ratio of words found
-                        score = 0.5 + (found_count / len(keywords)) * 0.3
-                        
-                        # Extract a better snippet around the keyword match
-                        # Try to get a paragraph or section around the match
-                        start = max(0, first_idx - 300)
-                        end = min(len(text), first_idx + 500)
-                        
-                        # Try to find sentence boundaries for cleaner snippets
-                        snippet_text = text[start:end]
-                        
-                        # Remove path/name metadata if present
-                        lines = snippet_text.split("\n")
-                        cleaned_lines = []
-                        skip_metadata = True
-                        for line in lines:
-                            if skip_metadata and (line.startswith("path:") or line.startswith("name:")):
-                                continue
-                            skip_metadata = False
-                            cleaned_lines.append(line)
-                        
-                        snippet_text = "\n".join(cleaned_lines)
-                        
-                        # Clean up whitespace
-                        snippet = " ".join(snippet_text.split())
-                        if len(snippet) > 800:
-                            snippet = snippet[:800] + "..."
-                        
-                        if snippet.lower() not in seen_snippets and len(snippet) > 50:
-                            matches.append({
-                                "path": rel_path,
-                                "snippet": snippet,
-                                "score": score,
-                                "found_count": found_count
-                            })
-                            seen_snippets.add(snippet.lower())
-
-                # Sort matches by found_count then score
-                matches.sort(key=lambda x: (-x["found_count"], -x["score"]))
-                print(f"DEBUG: Keyword search found {len(matches)} matches")
-                for m in matches:
-                    if len(results) >= top_k: break
-                    results.append({
-                        "path": m["path"],
-                        "snippet": m["snippet"],
-                        "score": m["score"]
-                    })
-            else:
-                print(f"DEBUG: Manifest file not found at {manifest_path}")
-        except Exception as e:
-            print(f"ERROR: KEYWORD SEARCH failed: {e}")
-            import traceback
-            traceback.print_exc()
 
-    final_results = sorted(results, key=lambda x: -x["score"])[:top_k]
-    print(f"DEBUG: Search complete. Returning {len(final_results)} results (requested {top_k})")
-    return final_results
+# Reciprocal rank fusion constant: score(file) = sum over retrievers of 1 / (RRF_K + rank)
+RRF_K = 60
+
+
+def _fusion_key(path: str, snippet: str):
+    """Results are fused per file; dense hits without path metadata are keyed by their snippet."""
+    if path == "Library Document":
+        return _snippet_key(snippet)
+    return os.path.normpath(path.strip().replace("\\", "/"))
+
+
+def _search_uncached(query: str, top_k: int = 5) -> tuple:
+    """
+    Hybrid search: semantic (Cactus) and BM25 each retrieve 2*top_k candidates, fused per file
+    with reciprocal rank fusion. Keyword snippets are only cut for the fused winners.
+    Returns (list of { "path", "snippet", "score" } with score the RRF score, complete), where
+    complete is False if either retriever fell back or failed.
+    """
+    depth = top_k * 2
+    dense, complete = _dense_search(query, depth)
+
+    sparse = []
+    index = None
+    cache_dir = _get_cache_dir()
+    keywords, keyword_re = _query_keywords(query)
+    try:
+        index = bm25_index.load_index(cache_dir)
+        if index is not None:
+            print(f"DEBUG: BM25 search over {len(index['docs'])} indexed chunks using keywords: {keywords}")
+            sparse = bm25_index.top_docs(index, keywords, depth)
+        else:
+            print(f"DEBUG: Manifest file not found in {cache_dir}")
+    except Exception as e:
+        complete = False
+        print(f"ERROR: KEYWORD SEARCH failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+    # Rank per retriever is the rank of the file's best chunk; that chunk supplies the snippet.
+    fused: Dict[Any, list] = {}  # key -> [rrf, path, dense result or None, bm25 hit or None]
+    dense_rank = 0
+    for r in dense:
+        key = _fusion_key(r["path"], r["snippet"])
+        if key in fused:
+            continue
+        dense_rank += 1
+        fused[key] = [1.0 / (RRF_K + dense_rank), r["path"], r, None]
+    seen_files = set()
+    sparse_rank = 0
+    for hit in sparse:
+        rel_path = index["docs"][hit[0]][0]
+        key = _fusion_key(rel_path, "")
+        if key in seen_files:
+            continue
+        seen_files.add(key)
+        sparse_rank += 1
+        entry = fused.setdefault(key, [0.0, rel_path, None, None])
+        entry[0] += 1.0 / (RRF_K + sparse_rank)
+        entry[3] = hit
+    ranked = sorted(fused.values(), key=lambda e: -e[0])
+    print(f"DEBUG: Fused {len(dense)} semantic and {len(sparse)} BM25 candidates into {len(ranked)} files")
+
+    def snippet_for(entry):
+        if entry[2] is not None:
+            return entry[2]["snippet"]
+        doc_id, _, first_idx = entry[3]
+        snippet = _keyword_snippet(cache_dir / index["docs"][doc_id][1], first_idx, keyword_re)
+        return snippet if snippet and len(snippet) > 50 else None
+
+    results = []
+    seen_snippets = set()
+    pos = 0
+    while pos < len(ranked) and len(results) < top_k:
+        # Cut as many snippets as results are still missing, concurrently, in rank order
+        batch = ranked[pos:pos + top_k - len(results)]
+        pos += len(batch)
+        for entry, snippet in zip(batch, _IO_POOL.map(snippet_for, batch)):
+            if snippet is None:
+                continue
+            key = _snippet_key(snippet)
+            if key in seen_snippets:
+                continue
+            seen_snippets.add(key)
+            results.append({"path": entry[1], "snippet": snippet, "score": entry[0]})
+
+    print(f"DEBUG: Search complete. Returning {len(results)} results (requested {top_k})")
+    return results, complete
@@ -1,5 +1,11 @@
+import os
+import json
+import numpy as np
 from fastapi.testclient import TestClient
 from backend.main import app  # Imports your exact FastAPI instance
+from backend import bm25_index
+from backend.retrieval import _query_keywords
+from main import _JsonObjectStream, _first_json_object
 
 # Create a dummy client to simulate a user talking to your API
 client = TestClient(app)
@@ -34,4 +40,152 @@ def test_bs_detector_passes_normal_text():
     data = response.json()
     
     assert response.status_code == 200
-    assert data["is_bs"] == False
\ No newline at end of file
+    assert data["is_bs"] == False
+
+def test_bs_detector_rejects_missing_text():
+    # A body without "text" should be a validation error, not a crash
+    response = client.post("/detect", json={"message": "hello"})
+
+    assert response.status_code == 422
+    # Same detail shape as FastAPI's own validation errors
+    assert response.json()["detail"] == [{"type": "missing", "loc": ["body", "text"], "msg": "Field required"}]
+
+def test_bs_detector_rejects_wrong_type_and_bad_json():
+    response = client.post("/detect", json={"text": 5})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "text"]
+
+    response = client.post("/detect", content=b"{bad", headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+def test_bs_detector_request_schema_in_openapi():
+    body = client.get("/openapi.json").json()["paths"]["/detect"]["post"]["requestBody"]
+    schema = body["content"]["application/json"]["schema"]
+
+    assert schema["required"] == ["text"]
+    assert schema["properties"]["text"]["type"] == "string"
+
+# ---- BM25 index (backend/bm25_index.py) ----
+
+BM25_CHUNKS = {
+    "a_chunk0.txt": "photosynthesis converts light energy into chemical energy",
+    "b_chunk0.txt": "the mitochondria is the powerhouse of the cell",
+    "c_chunk0.txt": "light reactions and the calvin cycle make up photosynthesis in the chloroplast",
+}
+
+def _bm25_build(cache_dir):
+    index = bm25_index.new_index()
+    manifest = {}
+    for name, text in BM25_CHUNKS.items():
+        (cache_dir / name).write_text(text, encoding="utf-8")
+        manifest[name[0] + ".txt"] = [name]
+        bm25_index.add_document(index, name[0] + ".txt", name, text)
+    (cache_dir / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return index
+
+def _bm25_scores(kernel, index, terms):
+    vocab = index["vocab"]
+    term_idxs = np.array([vocab[t] for t in terms if t in vocab], dtype=np.int64)
+    n = len(index["docs"])
+    scores = np.zeros(n, dtype=np.float32)
+    first = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+    kernel(
+        term_idxs, index["postings_off"], index["postings_doc"], index["postings_tf"], index["postings_first"],
+        index["idf"], index["doc_len"], index["avgdl"], bm25_index.K1, bm25_index.B, scores, first,
+    )
+    return scores, first
+
+def test_bm25_kernel_matches_numpy_fallback(tmp_path):
+    # The numba kernel and the NumPy fallback must score (and so rank) chunks identically
+    index = bm25_index.finalize(_bm25_build(tmp_path))
+    terms = ["photosynthesis", "light", "cell"]
+    jit_scores, jit_first = _bm25_scores(bm25_index._bm25_kernel, index, terms)
+    np_scores, np_first = _bm25_scores(bm25_index._bm25_numpy, index, terms)
+
+    assert np.allclose(jit_scores, np_scores)
+    assert (jit_first == np_first).all()
+    assert list(np.argsort(-jit_scores, kind="stable")) == list(np.argsort(-np_scores, kind="stable"))
+
+def test_bm25_write_and_load_round_trip(tmp_path):
+    index = _bm25_build(tmp_path)
+    bm25_index.write_index(tmp_path, index)
+    bm25_index._loaded.clear()
+
+    loaded = bm25_index.load_index(tmp_path)
+
+    assert loaded["docs"] == index["docs"]
+    assert loaded["vocab"] == index["vocab"]
+    hits = bm25_index.top_docs(loaded, ["photosynthesis", "light"], 2)
+    assert [loaded["docs"][d][1] for d, _, _ in hits] == ["a_chunk0.txt", "c_chunk0.txt"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_bm25_stale_index_is_rebuilt_from_manifest(tmp_path):
+    bm25_index.write_index(tmp_path, _bm25_build(tmp_path))
+    # Re-index that drops "b" and is newer than the persisted index
+    (tmp_path / "manifest.json").write_text(json.dumps({"a.txt": ["a_chunk0.txt"]}), encoding="utf-8")
+    index_path = tmp_path / bm25_index.INDEX_FILENAME
+    old = os.stat(tmp_path / "manifest.json").st_mtime_ns - 10**9
+    os.utime(index_path, ns=(old, old))
+    bm25_index._loaded.clear()
+
+    loaded = bm25_index.load_index(tmp_path)
+
+    assert loaded["docs"] == [("a.txt", "a_chunk0.txt")]
+    assert bm25_index.top_docs(loaded, ["mitochondria"], 5) == []
+
+def test_bm25_empty_query_returns_nothing(tmp_path):
+    index = bm25_index.finalize(_bm25_build(tmp_path))
+
+    assert bm25_index.top_docs(index, [], 5) == []
+    assert bm25_index.top_docs(index, ["nonexistentterm"], 5) == []
+
+def test_bm25_stopword_only_query_still_matches(tmp_path):
+    # "what is the" / "to a" have no content words; retrieval falls back to the unfiltered terms
+    index = bm25_index.finalize(_bm25_build(tmp_path))
+    keywords, _ = _query_keywords("what is the")
+
+    assert keywords == ("what", "is", "the")
+    assert _query_keywords("to a")[0] == ("to", "a")
+    assert _query_keywords("what is photosynthesis")[0] == ("photosynthesis",)
+    assert [index["docs"][d][1] for d, _, _ in bm25_index.top_docs(index, keywords, 5)] == ["b_chunk0.txt", "c_chunk0.txt"]
+
+# ---- Streamed JSON scanning (main._JsonObjectStream decides when to cactus_stop) ----
+def _stream_tokens(text, size=3):
+    """Push text in small chunks, as tokens arrive; returns (stream, index of the chunk that completed it)."""
+    stream = _JsonObjectStream()
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    for n, chunk in enumerate(chunks):
+        if stream.push(chunk) is not None:
+            return stream, n
+    return stream, None
+
+def test_json_stream_ignores_braces_inside_strings():
+    text = '{"function_calls": [{"name": "note", "arguments": {"text": "a } b { c"}}]}'
+    stream, done_at = _stream_tokens(text)
+
+    assert stream.result == {"function_calls": [{"name": "note", "arguments": {"text": "a } b { c"}}]}
+    assert done_at == (len(text) - 1) // 3  # not before the real closing brace
+    assert _first_json_object(text) == stream.result
+
+def test_json_stream_handles_escaped_quotes():
+    text = '{"response": "she said \\"}\\" and left", "n": 1}'
+    stream, _ = _stream_tokens(text)
+
+    assert stream.result == {"response": 'she said "}" and left', "n": 1}
+    assert _first_json_object(text) == stream.result
+
+def test_json_stream_skips_leading_prose():
+    text = 'Sure, calling the tool now: {"function_calls": [{"name": "set_dnd", "arguments": {"status": true}}]} done'
+    stream, _ = _stream_tokens(text)
+
+    assert stream.result == {"function_calls": [{"name": "set_dnd", "arguments": {"status": True}}]}
+    assert _first_json_object(text) == stream.result
+
+def test_json_stream_truncated_output_yields_nothing():
+    text = '{"function_calls": [{"name": "set_alarm", "arguments": {"hour": 7'
+    stream, done_at = _stream_tokens(text)
+
+    assert done_at is None
+    assert stream.result is None
+    assert _first_json_object(text) is None
@@ -13,7 +13,10 @@ export async function POST(request: Request) {
   try {
     const res = await fetch(`${BACKEND}/api/chat`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: {
+        "Content-Type": "application/json",
+        "X-Session-Id": request.headers.get("X-Session-Id") || "default",
+      },
       body: JSON.stringify(body ?? {}),
     });
     const data = await res.json();
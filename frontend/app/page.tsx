@@ -68,6 +68,22 @@ export default function App() {
   const [speechToAction, setSpeechToAction] = useState(false);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const bottomRef = useRef<HTMLDivElement>(null);
+  const sessionIdRef = useRef("");
+
+  // Per-tab id sent as X-Session-Id so the backend keeps a separate chat history for each tab
+  function sessionId(): string {
+    if (!sessionIdRef.current) {
+      let id = sessionStorage.getItem("deepfocus-session-id");
+      if (!id) {
+        id = typeof crypto.randomUUID === "function"
+          ? crypto.randomUUID()
+          : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        sessionStorage.setItem("deepfocus-session-id", id);
+      }
+      sessionIdRef.current = id;
+    }
+    return sessionIdRef.current;
+  }
 
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -177,7 +193,7 @@ export default function App() {
 
       const res = await fetch("/api/chat", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "X-Session-Id": sessionId() },
         body: JSON.stringify({ 
           message: text, 
           force_local: forceLocal,
@@ -216,7 +232,7 @@ export default function App() {
     try {
       await fetch("/api/chat", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "X-Session-Id": sessionId() },
         body: JSON.stringify({ message: "clear", history: [] }),
       });
       setMessages([
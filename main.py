@@ -1,89 +1,287 @@
 
-import sys, os, json, time
+import atexit, collections, copy, functools, hashlib, mmap, re, sys, os, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    from orjson import loads as _json_loads  # raises a json.JSONDecodeError subclass on bad input
+
+    def _cache_key_bytes(obj):
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    from json import loads as _json_loads
+
+    def _cache_key_bytes(obj):
+        return json.dumps(obj, sort_keys=True, default=str).encode()
 sys.path.insert(0, "cactus/python/src")
 
-if os.path.exists(".env"):
-    with open(".env") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                parts = line.split('=', 1)
-                if len(parts) == 2:
-                    key, val = parts
-                    os.environ[key.strip()] = val.strip().strip('"\'')
+# KEY=value lines (optionally quoted); comments and malformed lines simply don't match
+_ENV_RE = re.compile(rb'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t\r]*$', re.M)
+
+def load_env(path=".env"):
+    """Apply KEY=value pairs from path to os.environ (file values win); a missing file is a no-op."""
+    if not os.path.exists(path) or not os.path.getsize(path):  # mmap rejects empty files
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        os.environ.update({m[1].decode(): m[2].decode().strip('"\'') for m in _ENV_RE.finditer(mm)})
+
+load_env()
 
 cwd = os.getcwd()
-functiongemma_path = os.path.join(cwd, "cactus/weights/functiongemma-270m-it")
+# FUNCTIONGEMMA_PATH can point at a quantized conversion (e.g. INT8/INT4) of the same model
+functiongemma_path = os.environ.get("FUNCTIONGEMMA_PATH") or os.path.join(cwd, "cactus/weights/functiongemma-270m-it")
 whisper_path = os.path.join(cwd, "cactus/weights/whisper-small")
 
-from cactus import cactus_init, cactus_complete, cactus_destroy
-from google import genai
-from google.genai import types
+from cactus import cactus_init, cactus_complete, cactus_destroy, cactus_stop
 
 _whisper_model = None
 _cactus_model = None
-
-def transcribe_audio(audio_path: str) -> str:
-    """Lazily load Whisper model and transcribe a WAV audio file."""
+_cactus_lock = threading.Lock()
+_whisper_lock = threading.Lock()
+# The native FunctionGemma handle is not safe for concurrent cactus_complete calls; callers
+# (e.g. the backend running several chats in its threadpool) queue on this lock.
+_cactus_call_lock = threading.Lock()
+
+def _get_cactus():
+    """Load FunctionGemma once per process; the handle is reused by every call and freed at exit."""
+    global _cactus_model
+    if _cactus_model is None:
+        with _cactus_lock:
+            if _cactus_model is None:
+                print(f"DEBUG: Initializing Cactus with {functiongemma_path}")
+                _cactus_model = cactus_init(functiongemma_path)
+                if _cactus_model is None:
+                    print("ERROR: cactus_init returned None!")
+    return _cactus_model
+
+@atexit.register
+def _destroy_models():
+    for model in (_cactus_model, _whisper_model):
+        if model is not None:
+            cactus_destroy(model)
+
+def _get_whisper():
+    """Load Whisper once per process (same locking as _get_cactus)."""
     global _whisper_model
-    from cactus import cactus_transcribe
     if _whisper_model is None:
-        _whisper_model = cactus_init(whisper_path)
-    return cactus_transcribe(_whisper_model, audio_path)
+        with _whisper_lock:
+            if _whisper_model is None:
+                _whisper_model = cactus_init(whisper_path)
+    return _whisper_model
+
+def _warm_models():
+    # Callers that arrive mid-load block on the model locks until the weights are resident.
+    _get_cactus()
+    if os.environ.get("CACTUS_PRELOAD_WHISPER", "0") == "1":
+        _get_whisper()
+
+# Load FunctionGemma in the background at import so the first request doesn't pay for it.
+# CACTUS_PRELOAD=0 keeps loading lazy. Whisper loads on first transcription unless
+# CACTUS_PRELOAD_WHISPER=1 is set (e.g. for a backend that serves voice input).
+if os.environ.get("CACTUS_PRELOAD", "1") != "0":
+    threading.Thread(target=_warm_models, name="cactus-preload", daemon=True).start()
+
+# Identical (messages, tools) requests within RESULT_CACHE_TTL_S seconds return the earlier model
+# result. Off by default so benchmark/leaderboard timings measure real calls; the backend opts in
+# through configure_result_cache. Empty results (errors, no output) are never cached.
+_RESULT_CACHE_MAX = 256
+_RESULT_CACHE_TTL_S = float(os.environ.get("RESULT_CACHE_TTL_S", "0"))
+_result_cache = collections.OrderedDict()  # (fn name, digest) -> (stored_at, result)
+_result_lock = threading.Lock()
+
+def configure_result_cache(ttl_s):
+    """Set the result-cache TTL in seconds (0 disables it and drops cached entries)."""
+    global _RESULT_CACHE_TTL_S
+    with _result_lock:
+        _RESULT_CACHE_TTL_S = float(ttl_s)
+        if _RESULT_CACHE_TTL_S <= 0:
+            _result_cache.clear()
+
+def _cached_result(fn):
+    @functools.wraps(fn)
+    def wrapper(messages, tools):
+        if _RESULT_CACHE_TTL_S <= 0:
+            return fn(messages, tools)
+        start_ns = time.perf_counter_ns()
+        payload = _cache_key_bytes([messages, tools])
+        key = (fn.__name__, hashlib.blake2b(payload, digest_size=16).digest())
+        now = time.monotonic()
+        with _result_lock:
+            hit = _result_cache.get(key)
+            if hit and now - hit[0] < _RESULT_CACHE_TTL_S:
+                _result_cache.move_to_end(key)
+                result = copy.deepcopy(hit[1])
+                result["total_time_ms"] = (time.perf_counter_ns() - start_ns) / 1e6
+                result["cached"] = True
+                return result
+        result = fn(messages, tools)
+        if result.get("function_calls") or result.get("response"):
+            with _result_lock:
+                _result_cache[key] = (now, copy.deepcopy(result))
+                _result_cache.move_to_end(key)
+                while len(_result_cache) > _RESULT_CACHE_MAX:
+                    _result_cache.popitem(last=False)
+        return result
+    return wrapper
 
-def generate_cactus(messages, tools):
-    """Run function calling on-device via FunctionGemma + Cactus."""
-    global _cactus_model
-    if _cactus_model is None:
-        print(f"DEBUG: Initializing Cactus with {functiongemma_path}")
-        _cactus_model = cactus_init(functiongemma_path)
-        if _cactus_model is None:
-            print("ERROR: cactus_init returned None!")
-
-    cactus_tools = [{
-        "type": "function",
-        "function": t,
-    } for t in tools]
-
-    print(f"DEBUG: Calling cactus_complete with handle {_cactus_model}")
-    cactus_system_prompt = (
-        "System: You are an OS assistant. Use the provided tools by outputting JSON. "
-        "Example: {\"function_calls\": [{\"name\": \"set_dnd\", \"arguments\": {\"status\": true}}]}"
-    )
-    
-    raw_str = cactus_complete(
-        _cactus_model,
-        [{"role": "system", "content": cactus_system_prompt}] + messages,
-        tools=cactus_tools,
-        force_tools=True,
-        max_tokens=64, # Cap latency on local hallucinations
-        stop_sequences=["<|im_end|>", "<end_of_turn>"],
-        confidence_threshold=0.0,
-    )
+def transcribe_audio(audio_path: str) -> str:
+    """Transcribe a WAV audio file with the shared Whisper model."""
+    from cactus import cactus_transcribe
+    return cactus_transcribe(_get_whisper(), audio_path)
 
-    print(f"DEBUG: Cactus Raw: {raw_str}")
-    if not raw_str:
-        return {"function_calls": [], "total_time_ms": 0, "confidence": 0, "cloud_handoff": True}
+_JSON_DECODER = json.JSONDecoder()
 
-    import re
-    raw = None
-    # Try to extract JSON if it's wrapped in text
-    json_match = re.search(r'\{.*\}', raw_str, re.DOTALL)
-    if json_match:
+def _first_json_object(s):
+    """
+    The whole string if it is a JSON object, else the first balanced object embedded in it
+    (e.g. JSON wrapped in text). raw_decode stops at the object's end, so there's no greedy regex
+    span to backtrack over. Returns None if there is no object.
+    """
+    try:
+        obj = _json_loads(s)
+        return obj if isinstance(obj, dict) else None
+    except (json.JSONDecodeError, TypeError):
+        pass
+    idx = s.find("{")
+    end = s.rfind("}")
+    if idx != -1 and end > idx:
+        # Common case: one object with prose around it; the outermost braces slice it out
         try:
-            raw = json.loads(json_match.group(0))
+            obj = _json_loads(s[idx:end + 1])
+            if isinstance(obj, dict):
+                return obj
         except (json.JSONDecodeError, TypeError):
-            # If extracting from regex match fails, try loading the whole string
-            try:
-                raw = json.loads(raw_str)
-            except (json.JSONDecodeError, TypeError):
-                pass # raw remains None
-    else:
-        # If no regex match, try loading the whole string directly
+            pass
+    while idx != -1:
         try:
-            raw = json.loads(raw_str)
-        except (json.JSONDecodeError, TypeError):
-            pass # raw remains None
+            obj, _ = _JSON_DECODER.raw_decode(s, idx)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        idx = s.find("{", idx + 1)
+    return None
+
+class _JsonObjectStream:
+    """
+    Incremental scan of streamed model text: tracks brace depth (string/escape aware) across
+    pushes and exposes the first top-level JSON object as soon as its closing brace arrives.
+    """
+    __slots__ = ("text", "result", "_pos", "_start", "_depth", "_in_str", "_esc")
+
+    def __init__(self):
+        self.text = ""
+        self.result = None
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+
+    def push(self, chunk):
+        """Feed more text; returns the completed object (a dict) once one has closed, else None."""
+        if self.result is not None:
+            return self.result
+        if chunk.__class__ is bytes:
+            chunk = chunk.decode("utf-8", "ignore")
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                if self._depth:
+                    self._in_str = True
+            elif c == "{":
+                if not self._depth:
+                    self._start = i
+                self._depth += 1
+            elif c == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    try:
+                        obj = _json_loads(text[self._start:i + 1])
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    if isinstance(obj, dict):
+                        self.result = obj
+                        self._pos = i + 1
+                        return obj
+        self._pos = len(text)
+        return None
+
+# Per-call debug output (handle, raw completion) only with CACTUS_DEBUG=1; formatting a
+# multi-KB completion and writing it to stdout on every request isn't free.
+_DEBUG = os.environ.get("CACTUS_DEBUG", "0") not in ("", "0")
+
+# Chat-template end markers only; call boundaries are not stops since one turn may hold several calls
+_STOP_SEQUENCES = ["<|im_end|>", "<end_of_turn>"]
+
+_CACTUS_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "System: You are an OS assistant. Use the provided tools by outputting JSON. "
+        "Example: {\"function_calls\": [{\"name\": \"set_dnd\", \"arguments\": {\"status\": true}}]}"
+    ),
+}
+
+_cactus_tools_cache = {}  # id(tools) -> (tools, wrapped); holding tools keeps the id from being reused
+
+def _cactus_tools(tools):
+    """Tools in Cactus's {"type": "function", "function": ...} form, wrapped once per tools object."""
+    hit = _cactus_tools_cache.get(id(tools))
+    if hit is not None and hit[0] is tools:
+        return hit[1]
+    wrapped = [{"type": "function", "function": t} for t in tools]
+    if len(_cactus_tools_cache) >= 32:
+        _cactus_tools_cache.clear()
+    _cactus_tools_cache[id(tools)] = (tools, wrapped)
+    return wrapped
+
+@_cached_result
+def generate_cactus(messages, tools):
+    """Run function calling on-device via FunctionGemma + Cactus."""
+    model = _get_cactus()
+
+    cactus_tools = _cactus_tools(tools)
+
+    # The model's own text is scanned as it streams; its first complete object backs up the
+    # parsed wrapper Cactus returns when that comes back empty or unparseable. Once a
+    # function_calls object has closed (all calls sit inside it) the remaining max_tokens
+    # budget is only trailing text, so decoding is stopped there.
+    stream = _JsonObjectStream()
+
+    def on_token(token, token_id, user_data):
+        if stream.result is None:
+            obj = stream.push(token)
+            if obj is not None and obj.get("function_calls"):
+                cactus_stop(model)
+
+    if _DEBUG:
+        print(f"DEBUG: Calling cactus_complete with handle {model}")
+    with _cactus_call_lock:
+        raw_str = cactus_complete(
+            model,
+            [_CACTUS_SYSTEM_MESSAGE, *messages],
+            tools=cactus_tools,
+            force_tools=True,
+            max_tokens=64, # Cap latency on local hallucinations
+            stop_sequences=_STOP_SEQUENCES,
+            confidence_threshold=0.0,
+            callback=on_token,
+        )
+
+    if _DEBUG:
+        print(f"DEBUG: Cactus Raw: {raw_str}")
+    raw = _first_json_object(raw_str) if raw_str else None
+    if raw is None and stream.result is not None and stream.result.get("function_calls"):
+        raw = stream.result
 
     if raw is None:
         return {
@@ -103,28 +301,24 @@ def generate_cactus(messages, tools):
 
 def generate_cactus_text(messages, max_tokens=256):
     """Generate plain text locally via Cactus (no tools)."""
-    global _cactus_model
-    if _cactus_model is None:
-        print(f"DEBUG: Initializing Cactus with {functiongemma_path}")
-        _cactus_model = cactus_init(functiongemma_path)
-        if _cactus_model is None:
-            print("ERROR: cactus_init returned None!")
-
-    raw_str = cactus_complete(
-        _cactus_model,
-        messages,
-        tools=None,
-        force_tools=False,
-        max_tokens=max_tokens,
-        stop_sequences=["<|im_end|>", "<end_of_turn>"],
-        confidence_threshold=0.0,
-    )
+    model = _get_cactus()
+
+    with _cactus_call_lock:
+        raw_str = cactus_complete(
+            model,
+            messages,
+            tools=None,
+            force_tools=False,
+            max_tokens=max_tokens,
+            stop_sequences=_STOP_SEQUENCES,
+            confidence_threshold=0.0,
+        )
 
     if not raw_str:
         return {"response": "", "total_time_ms": 0, "confidence": 0, "cloud_handoff": True}
 
     try:
-        raw = json.loads(raw_str)
+        raw = _json_loads(raw_str)
     except (json.JSONDecodeError, TypeError):
         return {"response": raw_str.strip(), "total_time_ms": 0, "confidence": 0, "cloud_handoff": False}
 
@@ -135,64 +329,183 @@ def generate_cactus_text(messages, max_tokens=256):
         "cloud_handoff": raw.get("cloud_handoff", False),
     }
 
-def generate_cloud(messages, tools):
-    """Run function calling via Gemini Cloud API."""
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("ERROR: Missing GEMINI_API_KEY environment variable.")
-        return {"function_calls": [], "total_time_ms": 0, "response": ""}
+@functools.cache
+def _genai():
+    """Import google-genai on first cloud use, so runs that stay on-device never load it."""
+    from google import genai
+    from google.genai import types
+    return genai, types
 
-    client = genai.Client(api_key=api_key)
+def _gemini_http_options():
+    """Pool sized for bursts of concurrent fallbacks; HTTP/2 multiplexing when h2 is installed."""
+    types = _genai()[1]
+    try:
+        import httpx
+    except ImportError:
+        return None
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    limits = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+    return types.HttpOptions(client_args={"limits": limits, "http2": http2})
+
+_gemini_client = None  # (api_key, client)
+_gemini_lock = threading.Lock()
+
+def get_gemini_client(api_key):
+    """One genai.Client per API key for the process, so its HTTP connection pool is reused."""
+    global _gemini_client
+    cached = _gemini_client
+    if cached is None or cached[0] != api_key:
+        with _gemini_lock:
+            if _gemini_client is None or _gemini_client[0] != api_key:
+                _gemini_client = (api_key, _genai()[0].Client(api_key=api_key, http_options=_gemini_http_options()))
+            cached = _gemini_client
+    return cached[1]
+
+def _tools_key(tools):
+    """Hashable signature of a tool list: exactly the fields the Gemini schema is built from."""
+    return tuple(
+        (
+            t["name"],
+            t["description"],
+            tuple((k, v["type"], v.get("description", "")) for k, v in t["parameters"]["properties"].items()),
+            tuple(t["parameters"].get("required", [])),
+        )
+        for t in tools
+    )
 
-    gemini_tools = [
+@functools.lru_cache(maxsize=32)
+def _gemini_tools(tools_key):
+    """Build the types.Tool graph once per distinct tool list."""
+    types = _genai()[1]
+    return [
         types.Tool(function_declarations=[
             types.FunctionDeclaration(
-                name=t["name"],
-                description=t["description"],
+                name=name,
+                description=description,
                 parameters=types.Schema(
                     type="OBJECT",
                     properties={
-                        k: types.Schema(type=v["type"].upper(), description=v.get("description", ""))
-                        for k, v in t["parameters"]["properties"].items()
+                        k: types.Schema(type=ptype.upper(), description=pdesc)
+                        for k, ptype, pdesc in props
                     },
-                    required=t["parameters"].get("required", []),
+                    required=list(required),
                 ),
             )
-            for t in tools
+            for name, description, props, required in tools_key
         ])
     ]
 
-    system_instruction = "You are a helpful Learning Assistant for students. Use tools to search their course materials (library) and provide synthesized answers from their notes."
+# Sliding-window limiter in front of Gemini: past GEMINI_MAX_RPS calls in the last second,
+# generate_cloud declines locally instead of drawing a 429 and its retry backoff. 0 disables it.
+_GEMINI_MAX_RPS = int(os.environ.get("GEMINI_MAX_RPS", "60"))
+_gemini_calls = collections.deque()  # monotonic start times of recent calls
+_gemini_rate_lock = threading.Lock()
+
+def _take_cloud_slot():
+    """Record a cloud call if the last second has room for it; False when over the limit."""
+    if _GEMINI_MAX_RPS <= 0:
+        return True
+    now = time.monotonic()
+    with _gemini_rate_lock:
+        while _gemini_calls and now - _gemini_calls[0] >= 1.0:
+            _gemini_calls.popleft()
+        if len(_gemini_calls) >= _GEMINI_MAX_RPS:
+            return False
+        _gemini_calls.append(now)
+        return True
+
+_CLOUD_SYSTEM_INSTRUCTION = "You are a helpful Learning Assistant for students. Use tools to search their course materials (library) and provide synthesized answers from their notes."
+
+@functools.lru_cache(maxsize=32)
+def _gemini_config(tools_key):
+    """GenerateContentConfig per tool list (None = no tools), validated once and reused read-only."""
+    types = _genai()[1]
+    return types.GenerateContentConfig(
+        system_instruction=_CLOUD_SYSTEM_INSTRUCTION,
+        tools=_gemini_tools(tools_key) if tools_key else None,
+    )
+
+def _gemini_contents(messages):
+    """
+    One Content per run of same-role turns, texts joined by newlines; non-user roles map to model.
+    Empty turns are dropped (the API rejects empty text parts).
+    """
+    types = _genai()[1]
     contents = []
+    last_role = None
+    texts = []
     for m in messages:
+        content = m["content"]
+        if content.__class__ is not str:
+            content = str(content)
+        if not content:
+            continue
         role = "user" if m["role"] == "user" else "model"
-        content = m["content"] if isinstance(m["content"], str) else str(m["content"])
-        contents.append(types.Content(role=role, parts=[types.Part.from_text(text=content)]))
-    start_time = time.time()
+        if role != last_role and texts:
+            contents.append(types.Content(role=last_role, parts=[types.Part(text="\n".join(texts))]))
+            texts = []
+        last_role = role
+        texts.append(content)
+    if texts:
+        contents.append(types.Content(role=last_role, parts=[types.Part(text="\n".join(texts))]))
+    return contents
+
+@_cached_result
+def generate_cloud(messages, tools):
+    """Run function calling via Gemini Cloud API."""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("ERROR: Missing GEMINI_API_KEY environment variable.")
+        return {"function_calls": [], "total_time_ms": 0, "response": ""}
+
+    if not _take_cloud_slot():
+        print("DEBUG: Gemini rate limit reached, skipping cloud call")
+        return {"function_calls": [], "total_time_ms": 0, "response": "", "rate_limited": True}
+
+    client = get_gemini_client(api_key)
+
+    config = _gemini_config(_tools_key(tools) if tools else None)
+
+    contents = _gemini_contents(messages)
+    start_ns = time.perf_counter_ns()
 
     try:
-        gemini_response = client.models.generate_content(
+        stream = client.models.generate_content_stream(
             model="gemini-2.5-flash",
             contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=gemini_tools if tools else None
-            ),
+            config=config,
         )
 
-        total_time_ms = (time.time() - start_time) * 1000
         function_calls = []
-        if gemini_response.candidates:
-            for candidate in gemini_response.candidates:
-                if candidate.content and candidate.content.parts:
-                    for part in candidate.content.parts:
-                        if part.function_call:
-                            function_calls.append({
-                                "name": part.function_call.name,
-                                "arguments": dict(part.function_call.args),
-                            })
+        text_parts = []
+        try:
+            for chunk in stream:
+                chunk_calls = []
+                for candidate in chunk.candidates or []:
+                    if candidate.content and candidate.content.parts:
+                        for part in candidate.content.parts:
+                            if part.function_call:
+                                chunk_calls.append({
+                                    "name": part.function_call.name,
+                                    "arguments": part.function_call.args or {},  # already a plain dict on the pydantic model
+                                })
+                            elif part.text and not part.thought:
+                                text_parts.append(part.text)
+                # Calls arrive whole (parallel calls together); once the model has moved on to
+                # prose after them, stop reading instead of waiting for the rest of the reply.
+                if function_calls and not chunk_calls:
+                    break
+                function_calls.extend(chunk_calls)
+        finally:
+            stream.close()
+
+        total_time_ms = (time.perf_counter_ns() - start_ns) / 1e6
         return {
-            "response": gemini_response.text if gemini_response.candidates else "",
+            "response": "".join(text_parts),
             "function_calls": function_calls,
             "total_time_ms": total_time_ms
         }
@@ -202,6 +515,24 @@ def generate_cloud(messages, tools):
 
 import json
 
+# Opt-in: with HYBRID_SPECULATIVE_CLOUD=1 the cloud call starts alongside the local one, so a
+# fallback costs max(local, cloud) instead of local + cloud, but every call is a billed Gemini
+# request. The default (0) calls the cloud only after local fails, which keeps benchmark and
+# submission runs from paying for it. HYBRID_SPECULATIVE_CLOUD=auto only speculates while at
+# least 30% of recent requests actually fell back to the cloud.
+_SPECULATIVE_MODE = os.environ.get("HYBRID_SPECULATIVE_CLOUD", "0").strip().lower()
+_SPECULATIVE_CLOUD = _SPECULATIVE_MODE != "0"
+_SPECULATIVE_MIN_RATE = 0.3
+_recent_fallbacks = collections.deque(maxlen=50)  # True per request that went to the cloud
+
+def _should_speculate():
+    if _SPECULATIVE_MODE != "auto":
+        return _SPECULATIVE_CLOUD
+    if len(_recent_fallbacks) < 10:
+        return True
+    return sum(_recent_fallbacks) >= _SPECULATIVE_MIN_RATE * len(_recent_fallbacks)
+_HYBRID_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-cloud")
+
 def generate_hybrid(messages, tools, default_threshold=0.85):
     """
     Structure + semantic guarded hybrid router.
@@ -279,8 +610,10 @@ def generate_hybrid(messages, tools, default_threshold=0.85):
         return True
 
     # -------------------------------------------------
-    # Phase 1: local preview
+    # Phase 1: local preview (cloud call racing it in the background)
     # -------------------------------------------------
+    start_ns = time.perf_counter_ns()
+    cloud_future = _HYBRID_POOL.submit(generate_cloud, messages, tools) if _should_speculate() else None
     local = generate_cactus(messages, tools)
 
     calls = local.get("function_calls", [])
@@ -293,14 +626,28 @@ def generate_hybrid(messages, tools, default_threshold=0.85):
     # -------------------------------------------------
     # If the local model returned a text response and didn't request cloud handoff, use it
     if local.get("response") and not local.get("cloud_handoff", False):
+        if cloud_future is not None:
+            cloud_future.cancel()  # only stops a call still queued; one in flight is discarded
+        _recent_fallbacks.append(False)
         local["source"] = "on-device (text)"
         return local
 
+    _recent_fallbacks.append(True)
+
     # Only hand off to cloud if local explicitly requests it or has no useful output
-    cloud = generate_cloud(messages, tools)
+    if cloud_future is not None:
+        cloud = cloud_future.result()
+        # Both ran concurrently, so the cost is wall-clock time, not the sum
+        cloud["total_time_ms"] = (time.perf_counter_ns() - start_ns) / 1e6
+    else:
+        cloud = generate_cloud(messages, tools)
+        cloud["total_time_ms"] += local.get("total_time_ms", 0)
+    if cloud.get("rate_limited"):
+        # Degrade to whatever the local model produced rather than an empty cloud result
+        local["source"] = "on-device (cloud rate-limited)"
+        return local
     cloud["source"] = "cloud (fallback)"
     cloud["local_confidence"] = local.get("confidence", 0)
-    cloud["total_time_ms"] += local.get("total_time_ms", 0)
     return cloud
 
     # 1. No function calls predicted
@@ -9,20 +9,24 @@ Usage:
 
 It'll ask you to pick: 1 = local only, 2 = cloud only, 3 = both. This will show exactly what each model outputs for "hi", "stock price of AAPL", and "weather in SF".
 """
-import sys, os, json, time
-
-# Load .env
-if os.path.exists(".env"):
-    with open(".env") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                parts = line.split('=', 1)
-                if len(parts) == 2:
-                    os.environ[parts[0].strip()] = parts[1].strip().strip('"\'')
+import sys, os, json, re, time
 
 sys.path.insert(0, "cactus/python/src")
 
+# Load .env with main.py's loader. The POC inits its own model handle below, so main's
+# background preload would only load a second copy.
+os.environ.setdefault("CACTUS_PRELOAD", "0")
+try:
+    from main import load_env
+except ImportError as e:
+    print(f"❌ Cannot import main.py: {e}")
+    print("   Make sure you ran: source cactus/venv/bin/activate")
+    sys.exit(1)
+load_env()
+
+# Outermost {...} span of a raw completion (the POC prints exactly what the model emitted)
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 # ─── Test tools ───
 TOOLS = [
     {
@@ -86,7 +90,7 @@ def test_local():
 
     for label, messages in TEST_CASES:
         print(f"\n--- {label}: \"{messages[0]['content']}\" ---")
-        start = time.time()
+        start_ns = time.perf_counter_ns()
         try:
             raw = cactus_complete(
                 model,
@@ -97,14 +101,13 @@ def test_local():
                 stop_sequences=["<|im_end|>", "<end_of_turn>"],
                 confidence_threshold=0.0,
             )
-            elapsed = (time.time() - start) * 1000
+            elapsed = (time.perf_counter_ns() - start_ns) / 1e6
             print(f"  Time: {elapsed:.0f}ms")
             print(f"  Raw output: {repr(raw)}")
 
             if raw:
                 try:
-                    import re
-                    match = re.search(r'\{.*\}', raw, re.DOTALL)
+                    match = _JSON_RE.search(raw)
                     if match:
                         parsed = json.loads(match.group(0))
                         print(f"  Parsed JSON: {json.dumps(parsed, indent=2)}")
@@ -148,12 +151,12 @@ def test_cloud():
     # Test A: Simple text generation (no tools)
     print(f"\n--- Test A: Simple text (no tools) ---")
     try:
-        start = time.time()
+        start_ns = time.perf_counter_ns()
         resp = client.models.generate_content(
             model="gemini-2.5-flash",
             contents="Say hello in exactly 5 words.",
         )
-        elapsed = (time.time() - start) * 1000
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e6
         print(f"  Time: {elapsed:.0f}ms")
         print(f"  Response: {resp.text}")
     except Exception as e:
@@ -178,20 +181,22 @@ def test_cloud():
         ])
     ]
 
+    config = types.GenerateContentConfig(
+        system_instruction="You are a helpful assistant. Use tools when appropriate.",
+        tools=gemini_tools,
+    )
+
     for label, messages in TEST_CASES:
         print(f"\n--- {label}: \"{messages[0]['content']}\" ---")
         contents = " ".join(m["content"] for m in messages if m["role"] == "user")
-        start = time.time()
+        start_ns = time.perf_counter_ns()
         try:
             resp = client.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction="You are a helpful assistant. Use tools when appropriate.",
-                    tools=gemini_tools,
-                ),
+                config=config,
             )
-            elapsed = (time.time() - start) * 1000
+            elapsed = (time.perf_counter_ns() - start_ns) / 1e6
             print(f"  Time: {elapsed:.0f}ms")
 
             function_calls = []
@@ -203,7 +208,7 @@ def test_cloud():
                             if part.function_call:
                                 function_calls.append({
                                     "name": part.function_call.name,
-                                    "arguments": dict(part.function_call.args),
+                                    "arguments": part.function_call.args or {},
                                 })
                             if part.text:
                                 text_parts.append(part.text)